@@ -1,4 +1,5 @@
 # petlog/src/api.py
+import asyncio
 import logging
 import os
 from datetime import datetime
@@ -10,9 +11,9 @@ from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
-from .camera_manager import get_camera_manager
+from .camera_manager import cleanup_camera_manager, get_camera_manager
 from .camera_service import CameraConfig
-from .database import get_db
+from .database import get_db, timestamp_to_datetime
 from .detection_service import (
     get_detection_service,
     start_detection_service,
@@ -35,6 +36,18 @@ from .streaming_service import get_streaming_service
 
 from .version import VERSION
 
+# orjson serializes JSON several times faster than the stdlib encoder,
+# which matters for the dashboard's 1 Hz status/event polling. It is
+# optional - the stdlib JSONResponse is used if it is not installed.
+try:
+    from fastapi.responses import ORJSONResponse
+
+    import orjson  # noqa: F401 - probe that the native library is present
+
+    _default_response_class = ORJSONResponse
+except ImportError:
+    _default_response_class = JSONResponse
+
 # Configure logging - console only
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -49,6 +62,7 @@ app = FastAPI(
     version=VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=_default_response_class,
 )
 
 # Mount static files for the web dashboard
@@ -139,11 +153,21 @@ async def live_video_stream(request: Request):
         logger.info(f"Serving MJPEG stream to {client_ip}")
         return streaming_service.create_stream_response()
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving MJPEG stream to {client_ip}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _stop_recording_after(camera_manager: Any, duration_seconds: int) -> None:
+    """Stop an active recording once the requested duration elapses."""
+    await asyncio.sleep(duration_seconds)
+    recording_path = camera_manager.stop_recording()
+    if recording_path is not None:
+        logger.info(f"Timed recording finished: {recording_path}")
+
+
 @app.post("/live/start")
 async def start_live_stream(
     request: Request,
@@ -178,14 +202,17 @@ async def start_live_stream(
             "active_streams": streaming_service.get_stream_count(),
         }
 
-        # TODO: Implement recording functionality in the new architecture
-        if record_duration is not None:
-            logger.warning(
-                "Recording functionality not yet implemented in new architecture"
-            )
-            response["recording_note"] = (
-                "Recording functionality will be implemented soon"
-            )
+        if record_duration is not None or filename is not None:
+            camera_manager = get_camera_manager()
+            recording_path = camera_manager.start_recording(filename)
+            if recording_path is None:
+                response["recording_note"] = "Recording could not be started"
+            else:
+                response["recording_path"] = recording_path
+                if record_duration is not None:
+                    asyncio.create_task(
+                        _stop_recording_after(camera_manager, record_duration)
+                    )
 
         logger.info(f"Stream started successfully for {client_ip}")
         return response
@@ -209,7 +236,11 @@ async def stop_live_stream(request: Request) -> Dict[str, Any]:
 
         response = {"message": "Live stream stopped successfully", "status": "stopped"}
 
-        # TODO: Implement recording functionality in the new architecture
+        # Finish any recording the stream start kicked off
+        recording_path = get_camera_manager().stop_recording()
+        if recording_path is not None:
+            response["recording_path"] = recording_path
+
         logger.info(f"Stream stopped successfully for {client_ip}")
         return response
 
@@ -218,6 +249,74 @@ async def stop_live_stream(request: Request) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/live/record/start")
+async def start_recording(
+    request: Request, filename: Optional[str] = None
+) -> Dict[str, Any]:
+    """Start recording video using the camera's hardware H.264 encoder.
+
+    Args:
+        filename: Custom filename for the recording (optional)
+    """
+    client_ip = request.client.host
+    logger.info(f"Recording start requested from {client_ip} - filename: {filename}")
+
+    try:
+        camera_manager = get_camera_manager()
+
+        # Ensure camera service is running before recording
+        if not camera_manager.is_running():
+            logger.info("Camera service not running, starting it...")
+            if not camera_manager.start():
+                raise HTTPException(
+                    status_code=500, detail="Failed to start camera service"
+                )
+
+        recording_path = camera_manager.start_recording(filename)
+        if recording_path is None:
+            raise HTTPException(status_code=500, detail="Failed to start recording")
+
+        logger.info(f"Recording started for {client_ip}: {recording_path}")
+        return {
+            "message": "Recording started successfully",
+            "status": "recording",
+            "recording_path": recording_path,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting recording for {client_ip}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/live/record/stop")
+async def stop_recording(request: Request) -> Dict[str, Any]:
+    """Stop the active video recording."""
+    client_ip = request.client.host
+    logger.info(f"Recording stop requested from {client_ip}")
+
+    try:
+        camera_manager = get_camera_manager()
+        recording_path = camera_manager.stop_recording()
+
+        if recording_path is None:
+            raise HTTPException(status_code=404, detail="No recording in progress")
+
+        logger.info(f"Recording stopped for {client_ip}: {recording_path}")
+        return {
+            "message": "Recording stopped successfully",
+            "status": "stopped",
+            "recording_path": recording_path,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error stopping recording for {client_ip}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/live/status")
 async def get_live_status(request: Request) -> Dict[str, Any]:
     """Get current live stream status."""
@@ -273,8 +372,8 @@ async def get_events(
 
             event = Event(
                 event_id=db_event["event_id"],
-                timestamp=datetime.fromisoformat(db_event["timestamp"]),
-                created_at=datetime.fromisoformat(db_event["timestamp"]),
+                timestamp=timestamp_to_datetime(db_event["timestamp"]),
+                created_at=timestamp_to_datetime(db_event["timestamp"]),
                 pet_id=db_event["pet_id"],
                 event_type=EventType(db_event["event_type"]),
                 media_path=db_event.get("media_path"),
@@ -321,8 +420,8 @@ async def get_event_details(event_id: int) -> Event:
 
         event = Event(
             event_id=db_event["event_id"],
-            timestamp=datetime.fromisoformat(db_event["timestamp"]),
-            created_at=datetime.fromisoformat(db_event["timestamp"]),
+            timestamp=timestamp_to_datetime(db_event["timestamp"]),
+            created_at=timestamp_to_datetime(db_event["timestamp"]),
             pet_id=db_event["pet_id"],
             event_type=EventType(db_event["event_type"]),
             media_path=db_event.get("media_path"),
@@ -529,14 +628,16 @@ async def camera_status() -> Dict[str, str]:
     return {
         "status": "connected" if status["initialized"] else "disconnected",
         "streaming": "active" if status.get("running", False) else "inactive",
-        "recording": "inactive",  # TODO: Implement recording in new architecture
+        "recording": "active" if status.get("recording", False) else "inactive",
         "resolution": (
             f"{status['resolution'][0]}x{status['resolution'][1]}"
             if status.get("resolution")
             else "unknown"
         ),
         "fps": str(status.get("frame_rate", 0)),
-        "last_frame": status.get("latest_frame_time", "never"),
+        # latest_frame_time is present but None before the first frame,
+        # so a plain .get() default would leak None into the response
+        "last_frame": status.get("latest_frame_time") or "never",
     }
 
 
@@ -618,7 +719,5 @@ async def shutdown_event():
         logger.error(f"Error stopping detection service: {e}")
 
     # Clean up camera resources
-    from .camera_manager import cleanup_camera_manager
-
     cleanup_camera_manager()
     logger.info("Cleanup completed")
@@ -72,6 +72,30 @@ class CameraManager:
         except Exception as e:
             logger.error(f"Error stopping camera manager: {e}")
 
+    def start_recording(self, filename: Optional[str] = None) -> Optional[str]:
+        """Start a hardware H.264 recording via the camera service."""
+        try:
+            camera_service = self.get_camera_service()
+            return camera_service.start_recording(filename)
+        except Exception as e:
+            logger.error(f"Failed to start recording: {e}")
+            return None
+
+    def stop_recording(self) -> Optional[str]:
+        """Stop the active recording via the camera service."""
+        try:
+            camera_service = self.get_camera_service()
+            return camera_service.stop_recording()
+        except Exception as e:
+            logger.error(f"Failed to stop recording: {e}")
+            return None
+
+    def is_recording(self) -> bool:
+        """Check whether a recording is in progress."""
+        if self._camera_service:
+            return self._camera_service.is_recording()
+        return False
+
     def is_running(self) -> bool:
         """Check if the camera service is running."""
         if self._camera_service:
@@ -5,20 +5,57 @@ This module provides a continuously running camera service that captures frames
 in the background and provides them to consumers (detection, streaming, etc.).
 """
 
-import cv2
 import logging
-import queue
+import math
+import os
 import threading
 import time
-from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# picamera2 is only available on Raspberry Pi systems; on development
+# machines we fall back to a mock camera that generates synthetic frames
+try:
+    from libcamera import Transform
+    from picamera2 import Picamera2
+    from picamera2.encoders import H264Encoder
+    from picamera2.outputs import FileOutput
+
+    PICAMERA2_AVAILABLE = True
+except ImportError:
+    Transform = None
+    Picamera2 = None
+    H264Encoder = None
+    FileOutput = None
+    PICAMERA2_AVAILABLE = False
 
-from picamera2 import Picamera2
 from .frame import Frame, FrameMetadata, FrameFormat
 
 logger = logging.getLogger(__name__)
 
+# H.264 recording defaults - the bitrate sits at the ~10 Mbps hardware
+# encoder ceiling documented for Pi 3-class devices (exceeding it produces
+# blank streams), and a 2-second keyframe interval keeps playback seekable
+# with predictable bandwidth
+DEFAULT_RECORDING_BITRATE = 10_000_000
+MAX_RECORDING_BITRATE = 10_000_000
+DEFAULT_KEYFRAME_INTERVAL_SECONDS = 2
+
+# Userspace write buffer for recording output: batches the encoder's
+# per-NAL-unit writes into 64 KB chunks so slow SD-card writes stall the
+# encoder thread far less often
+RECORDING_WRITE_BUFFER_BYTES = 64 * 1024
+
+# OpenCV sizes its internal thread pool from the host's visible CPU count;
+# on many-core or containerized hosts that oversubscribes the cores we
+# actually have and preempts the capture/streaming threads. Cap it.
+MAX_OPENCV_THREADS = 4
+cv2.setNumThreads(min(MAX_OPENCV_THREADS, os.cpu_count() or 1))
+
 
 class CameraConfig:
     """Configuration for camera operations."""
@@ -32,6 +69,11 @@ class CameraConfig:
         buffer_size: int = 5,  # Number of frames to keep in buffer
         enable_storage: bool = True,
         storage_path: str = "recordings",
+        capture_cpu_core: Optional[int] = None,  # Pin capture thread to this core
+        capture_nice: int = 0,  # Niceness delta for the capture thread
+        recording_bitrate: int = DEFAULT_RECORDING_BITRATE,
+        keyframe_interval_s: int = DEFAULT_KEYFRAME_INTERVAL_SECONDS,
+        capture_format: str = "RGB888",
     ):
         self.resolution = resolution
         self.frame_rate = frame_rate
@@ -40,6 +82,15 @@ class CameraConfig:
         self.buffer_size = buffer_size
         self.enable_storage = enable_storage
         self.storage_path = storage_path
+        self.capture_cpu_core = capture_cpu_core
+        self.capture_nice = capture_nice
+        self.recording_bitrate = recording_bitrate
+        self.keyframe_interval_s = keyframe_interval_s
+        # Sensor stream pixel format. "YUV420" lets the JPEG encoder skip
+        # its internal BGR->YCbCr pass, but only suits deployments where
+        # MJPEG streaming is the sole frame consumer - detection and the
+        # mock camera expect RGB888
+        self.capture_format = capture_format
 
     def validate(self) -> bool:
         """Validate configuration parameters."""
@@ -51,9 +102,107 @@ class CameraConfig:
             return False
         if self.buffer_size < 1 or self.buffer_size > 20:
             return False
+        if self.recording_bitrate <= 0 or self.recording_bitrate > MAX_RECORDING_BITRATE:
+            return False
+        if self.keyframe_interval_s < 1:
+            return False
         return True
 
 
+class MockCamera:
+    """
+    Mock camera used automatically on non-Raspberry Pi systems.
+
+    Mimics the subset of the Picamera2 interface that CameraService uses
+    and draws synthetic frames (timestamp plus a moving circle) into a
+    round-robin pool of preallocated buffers, so frame generation causes
+    no per-frame allocation. The pool must be deeper than any consumer's
+    retention of published frames (per-Frame JPEG caches, slow stream
+    clients) — CameraService sizes it to buffer_size + 1 so published
+    Frame.data stays effectively immutable.
+    """
+
+    MIN_FRAME_POOL_SIZE = 2
+
+    def __init__(self, resolution: tuple = (1280, 720), frame_pool_size: int = 6):
+        self.resolution = resolution
+        width, height = resolution
+        pool_size = max(frame_pool_size, self.MIN_FRAME_POOL_SIZE)
+        self._buffers = [
+            np.zeros((height, width, 3), dtype=np.uint8) for _ in range(pool_size)
+        ]
+        self._buffer_index = 0
+        self._start_time = time.monotonic()
+
+        # The timestamp text only changes once per second, so the rendered
+        # banner is cached and re-rasterized only on second boundaries;
+        # every other frame just blits it with a NumPy slice copy
+        self._banner_text: Optional[str] = None
+        self._banner: Optional[np.ndarray] = None
+
+    def create_video_configuration(self, main=None, transform=None) -> Dict[str, Any]:
+        return {"main": main, "transform": transform}
+
+    def configure(self, camera_config) -> None:
+        pass
+
+    def start(self) -> None:
+        logger.info("Mock camera started")
+
+    def stop(self) -> None:
+        logger.info("Mock camera stopped")
+
+    def close(self) -> None:
+        pass
+
+    def _get_timestamp_banner(self) -> np.ndarray:
+        """Get the rendered timestamp banner, re-rasterizing once per second."""
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        if timestamp != self._banner_text:
+            text = f"Mock Camera - {timestamp}"
+            (text_width, text_height), baseline = cv2.getTextSize(
+                text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2
+            )
+            banner = np.zeros((text_height + baseline, text_width, 3), dtype=np.uint8)
+            cv2.putText(
+                banner,
+                text,
+                (0, text_height),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1.0,
+                (255, 255, 255),
+                2,
+            )
+            self._banner = banner
+            self._banner_text = timestamp
+        return self._banner
+
+    def capture_array(self) -> np.ndarray:
+        """Draw a synthetic frame into the next preallocated buffer."""
+        self._buffer_index = (self._buffer_index + 1) % len(self._buffers)
+        buffer = self._buffers[self._buffer_index]
+        buffer.fill(0)
+
+        width, height = self.resolution
+
+        # Blit the cached banner (SIMD memcpy) instead of rasterizing text,
+        # clipped in case the banner is wider than a small mock frame
+        banner = self._get_timestamp_banner()
+        banner_height = min(banner.shape[0], height - 10)
+        banner_width = min(banner.shape[1], width - 10)
+        buffer[10:10 + banner_height, 10:10 + banner_width] = (
+            banner[:banner_height, :banner_width]
+        )
+
+        # Moving circle so streams visibly update
+        elapsed = time.monotonic() - self._start_time
+        center_x = int(width / 2 + (width / 3) * math.sin(elapsed))
+        center_y = int(height / 2 + (height / 4) * math.cos(elapsed))
+        cv2.circle(buffer, (center_x, center_y), 30, (0, 200, 0), -1)
+
+        return buffer
+
+
 class CameraService:
     """
     Continuously running camera service that captures frames in background.
@@ -68,12 +217,34 @@ class CameraService:
         self.camera = None
         self.is_running = False
         self._capture_thread = None
-        self._lock = threading.Lock()
+        # Reentrant so cleanup() can call stop() while holding it; guards
+        # lifecycle state only - slow camera I/O happens outside the lock
+        self._lock = threading.RLock()
         
         # Frame buffer - stores Frame objects
         self._latest_frame: Optional[Frame] = None
         self._frame_counter: int = 0
-        
+
+        # Consumers block on this condition until a new frame is published,
+        # so they wake on frame-ready instead of sleep-polling
+        self._frame_ready = threading.Condition()
+
+        # Callbacks invoked from the capture thread after each publish
+        # (used to signal asyncio consumers via call_soon_threadsafe)
+        self._frame_callbacks: List[Callable[[], None]] = []
+
+        # Hardware H.264 recording state
+        self._recording_encoder = None
+        self._recording_path: Optional[str] = None
+
+        # Immutable camera config snapshot shared by all frames - the values
+        # never change after init, so building a dict per frame is wasted work
+        self._camera_config_dict = MappingProxyType({
+            "resolution": self.config.resolution,
+            "frame_rate": self.config.frame_rate,
+            "quality": self.config.quality,
+        })
+
         # Create storage directory if needed
         if self.config.enable_storage:
             Path(self.config.storage_path).mkdir(exist_ok=True)
@@ -88,13 +259,29 @@ class CameraService:
                     logger.warning("Camera already initialized")
                     return True
 
-                self.camera = Picamera2()
-
-                # Configure for continuous capture
-                camera_config = self.camera.create_video_configuration(
-                    main={"size": self.config.resolution, "format": "RGB888"}
-                )
-                self.camera.configure(camera_config)
+                if PICAMERA2_AVAILABLE:
+                    self.camera = Picamera2()
+
+                    # The camera is mounted upside down: apply the 180-degree
+                    # rotation at the sensor/ISP level instead of rotating
+                    # every frame in software, so it costs zero CPU cycles
+                    # Configure for continuous capture
+                    camera_config = self.camera.create_video_configuration(
+                        main={
+                            "size": self.config.resolution,
+                            "format": self.config.capture_format,
+                        },
+                        transform=Transform(hflip=1, vflip=1),
+                    )
+                    self.camera.configure(camera_config)
+                else:
+                    logger.warning(
+                        "picamera2 not available - using mock camera for development"
+                    )
+                    self.camera = MockCamera(
+                        self.config.resolution,
+                        frame_pool_size=self.config.buffer_size + 1,
+                    )
 
                 logger.info(f"Camera initialized with resolution {self.config.resolution}")
                 return True
@@ -105,36 +292,41 @@ class CameraService:
 
     def start(self) -> bool:
         """Start the continuous camera capture service."""
+        # Claim the running state under the lock, then do the slow camera
+        # start and warmup outside it so status/frame readers are never
+        # blocked for the ~1s the hardware takes to come up
         with self._lock:
             if self.is_running:
                 logger.warning("Camera service already running")
                 return True
-            
+
             if not self.camera:
                 logger.error("Camera not initialized")
                 return False
 
-            try:
-                # Start camera hardware
-                self.camera.start()
-                time.sleep(1)  # Allow camera to warm up
-
-                # Start capture thread
-                self.is_running = True
-                self._capture_thread = threading.Thread(
-                    target=self._capture_loop,
-                    name="CameraService",
-                    daemon=True
-                )
-                self._capture_thread.start()
+            self.is_running = True
 
-                logger.info("Camera service started successfully")
-                return True
+        try:
+            # Start camera hardware
+            self.camera.start()
+            time.sleep(1)  # Allow camera to warm up
 
-            except Exception as e:
-                logger.error(f"Failed to start camera service: {e}")
+            # Start capture thread
+            self._capture_thread = threading.Thread(
+                target=self._capture_loop,
+                name="CameraService",
+                daemon=True
+            )
+            self._capture_thread.start()
+
+            logger.info("Camera service started successfully")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to start camera service: {e}")
+            with self._lock:
                 self.is_running = False
-                return False
+            return False
 
     def stop(self) -> None:
         """Stop the camera service."""
@@ -144,81 +336,256 @@ class CameraService:
 
             logger.info("Stopping camera service...")
             self.is_running = False
+            recording_encoder = self._recording_encoder
+            recording_path = self._recording_path
+            self._recording_encoder = None
+            self._recording_path = None
+            capture_thread = self._capture_thread
+
+        # Camera I/O and the thread join happen outside the lock: they can
+        # take seconds, and holding the lock here would stall every
+        # get_status/start_recording caller in the meantime
+        if recording_encoder is not None:
+            try:
+                self.camera.stop_encoder()
+                logger.info(f"Recording stopped: {recording_path}")
+            except Exception as e:
+                logger.error(f"Error stopping recording: {e}")
 
-            # Wait for capture thread to finish
-            if self._capture_thread and self._capture_thread.is_alive():
-                self._capture_thread.join(timeout=5.0)
+        # Wait for capture thread to finish
+        if capture_thread and capture_thread.is_alive():
+            capture_thread.join(timeout=5.0)
 
-            # Stop camera hardware
+        # Stop camera hardware
+        try:
+            if self.camera:
+                self.camera.stop()
+            logger.info("Camera service stopped")
+        except Exception as e:
+            logger.error(f"Error stopping camera: {e}")
+
+    def _apply_thread_tuning(self) -> None:
+        """Pin the capture thread to a CPU core / adjust its priority if configured."""
+        if self.config.capture_cpu_core is not None:
             try:
-                if self.camera:
-                    self.camera.stop()
-                logger.info("Camera service stopped")
-            except Exception as e:
-                logger.error(f"Error stopping camera: {e}")
+                os.sched_setaffinity(0, {self.config.capture_cpu_core})
+                logger.info(f"Capture thread pinned to CPU core {self.config.capture_cpu_core}")
+            except (AttributeError, OSError) as e:
+                logger.warning(f"Could not set capture thread CPU affinity: {e}")
+
+        if self.config.capture_nice != 0:
+            try:
+                os.nice(self.config.capture_nice)
+                logger.info(f"Capture thread niceness adjusted by {self.config.capture_nice}")
+            except OSError as e:
+                logger.warning(
+                    f"Could not adjust capture thread priority: {e} "
+                    "(negative values require CAP_SYS_NICE)"
+                )
 
     def _capture_loop(self) -> None:
         """Main capture loop that runs in background thread."""
         logger.info("Camera capture loop started")
+        self._apply_thread_tuning()
         frame_interval = 1.0 / self.config.frame_rate
-        
+
+        # Hoist hot-loop lookups into locals (CPython micro-optimization)
+        _time_ns = time.time_ns
+        # Monotonic clock for interval pacing - immune to NTP clock steps
+        _time = time.monotonic
+        _width, _height = self.config.resolution
+        _frame_format = (
+            FrameFormat.YUV420
+            if self.config.capture_format == "YUV420"
+            else FrameFormat.RGB888
+        )
+
+        # Absolute-deadline pacing: each iteration sleeps until the next
+        # scheduled capture instant rather than for a fixed interval, so
+        # per-frame jitter (encode time, scheduler wakeup latency) does not
+        # accumulate into long-term frame-rate drift
+        next_deadline = _time() + frame_interval
+
         while self.is_running:
             try:
-                start_time = time.time()
+                start_time = _time()
                 
-                # Capture frame from camera
+                # Capture frame from camera (already rotated 180 degrees
+                # by the sensor transform set at configuration time)
                 frame_array = self.camera.capture_array()
-                
-                # Rotate image 180 degrees
-                frame_array = cv2.rotate(frame_array, cv2.ROTATE_180)
-                
+
                 # Calculate processing time
-                processing_time = time.time() - start_time
-                
+                processing_time = _time() - start_time
+
                 # Create frame metadata
                 metadata = FrameMetadata(
-                    timestamp=datetime.now(),
+                    timestamp_ns=_time_ns(),
                     frame_number=self._frame_counter,
-                    width=self.config.resolution[0],
-                    height=self.config.resolution[1],
-                    format=FrameFormat.RGB888,
+                    width=_width,
+                    height=_height,
+                    format=_frame_format,
                     quality=self.config.quality,
                     frame_rate=self.config.frame_rate,
-                    camera_config={
-                        "resolution": self.config.resolution,
-                        "frame_rate": self.config.frame_rate,
-                        "quality": self.config.quality
-                    },
+                    camera_config=self._camera_config_dict,
                     processing_time=processing_time
                 )
                 
                 # Create Frame object
                 frame = Frame(data=frame_array, metadata=metadata)
+
+                # Publish the frame. The Frame is fully constructed before
+                # this point and never mutated afterwards, so a plain
+                # attribute rebind (atomic under the GIL) is safe for
+                # readers - no lock needed on the hot path.
+                self._latest_frame = frame
+                self._frame_counter += 1
+                with self._frame_ready:
+                    self._frame_ready.notify_all()
+                    callbacks = tuple(self._frame_callbacks)
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.debug(f"Frame callback failed: {e}")
                 
-                # Update frame buffer (thread-safe)
-                with self._lock:
-                    self._latest_frame = frame
-                    self._frame_counter += 1
-                
-                # Calculate sleep time to maintain frame rate
-                processing_time = time.time() - start_time
-                sleep_time = max(0, frame_interval - processing_time)
-                
+                # Sleep until the next absolute deadline to maintain frame rate
+                processing_time = _time() - start_time
                 if processing_time > frame_interval:
                     logger.debug(f"Frame processing took {processing_time:.3f}s, longer than interval {frame_interval:.3f}s")
-                
-                time.sleep(sleep_time)
-                
+
+                next_deadline += frame_interval
+                sleep_time = next_deadline - _time()
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+                else:
+                    # Running behind schedule: re-anchor instead of firing a
+                    # burst of catch-up captures
+                    next_deadline = _time() + frame_interval
+
             except Exception as e:
                 logger.error(f"Error in capture loop: {e}")
                 time.sleep(frame_interval)
+                next_deadline = _time() + frame_interval
         
         logger.info("Camera capture loop ended")
 
-    def get_latest_frame(self) -> Optional[Frame]:
-        """Get the latest frame."""
+    def start_recording(self, filename: Optional[str] = None) -> Optional[str]:
+        """
+        Start recording H.264 video using the Pi's hardware encoder.
+
+        The encoder taps the camera pipeline directly, so recording adds no
+        per-frame Python work and no CPU-side video encoding.
+
+        Args:
+            filename: Recording filename (a timestamped one is generated
+                      if omitted)
+
+        Returns:
+            Path of the recording file, or None if recording could not start
+        """
         with self._lock:
-            return self._latest_frame
+            if not self.is_running or self.camera is None:
+                logger.error("Cannot start recording: camera service not running")
+                return None
+
+            if not PICAMERA2_AVAILABLE:
+                logger.error(
+                    "Cannot start recording: hardware recording requires picamera2"
+                )
+                return None
+
+            if self._recording_encoder is not None:
+                logger.warning(f"Recording already in progress: {self._recording_path}")
+                return self._recording_path
+
+            try:
+                if filename is None:
+                    filename = time.strftime("recording_%Y%m%d_%H%M%S.h264")
+                else:
+                    # Keep only the basename: a client-supplied "../x" or
+                    # absolute path must not escape storage_path
+                    safe_name = Path(filename).name
+                    if safe_name != filename:
+                        logger.warning(
+                            f"Stripped path components from recording filename: {filename!r}"
+                        )
+                    filename = safe_name or time.strftime(
+                        "recording_%Y%m%d_%H%M%S.h264"
+                    )
+                recording_path = Path(self.config.storage_path) / filename
+
+                # Constant bitrate with a fixed keyframe cadence: smooth,
+                # predictable bandwidth and no throughput spikes on playback
+                encoder = H264Encoder(
+                    bitrate=self.config.recording_bitrate,
+                    iperiod=int(self.config.frame_rate * self.config.keyframe_interval_s),
+                )
+                # Hand FileOutput a buffered file object so NAL units are
+                # batched into large writes instead of one write(2) each
+                recording_file = open(
+                    recording_path, "wb", buffering=RECORDING_WRITE_BUFFER_BYTES
+                )
+                self.camera.start_encoder(encoder, FileOutput(recording_file))
+
+                self._recording_encoder = encoder
+                self._recording_path = str(recording_path)
+                logger.info(f"Hardware H.264 recording started: {recording_path}")
+                return self._recording_path
+
+            except Exception as e:
+                logger.error(f"Failed to start recording: {e}")
+                self._recording_encoder = None
+                self._recording_path = None
+                return None
+
+    def stop_recording(self) -> Optional[str]:
+        """
+        Stop the active recording.
+
+        Returns:
+            Path of the finished recording file, or None if not recording
+        """
+        with self._lock:
+            if self._recording_encoder is None:
+                logger.warning("No recording in progress")
+                return None
+
+            recording_path = self._recording_path
+            try:
+                self.camera.stop_encoder()
+                logger.info(f"Recording stopped: {recording_path}")
+            except Exception as e:
+                logger.error(f"Error stopping recording: {e}")
+            finally:
+                self._recording_encoder = None
+                self._recording_path = None
+
+            return recording_path
+
+    def is_recording(self) -> bool:
+        """Check whether a hardware recording is in progress."""
+        return self._recording_encoder is not None
+
+    def get_latest_frame(self) -> Optional[Frame]:
+        """
+        Get the latest frame.
+
+        Lock-free: the capture loop publishes fully-built, immutable Frame
+        objects with a single atomic attribute rebind, so readers can never
+        observe a half-published frame.
+        """
+        return self._latest_frame
+
+    def add_frame_callback(self, callback: Callable[[], None]) -> None:
+        """Register a callable invoked from the capture thread after each publish."""
+        with self._frame_ready:
+            self._frame_callbacks.append(callback)
+
+    def remove_frame_callback(self, callback: Callable[[], None]) -> None:
+        """Unregister a previously registered frame callback."""
+        with self._frame_ready:
+            if callback in self._frame_callbacks:
+                self._frame_callbacks.remove(callback)
 
     def is_active(self) -> bool:
         """Check if the camera service is actively running."""
@@ -236,6 +603,8 @@ class CameraService:
                 "quality": self.config.quality,
                 "buffer_size": self.config.buffer_size,
                 "storage_enabled": self.config.enable_storage,
+                "recording": self._recording_encoder is not None,
+                "recording_path": self._recording_path,
                 "latest_frame_time": self._latest_frame.timestamp.isoformat() if self._latest_frame else None,
                 "has_frame_data": self._latest_frame is not None,
                 "frame_counter": self._frame_counter
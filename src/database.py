@@ -8,13 +8,162 @@ initialization, and basic CRUD operations for the pet monitoring system.
 import json
 import logging
 import os
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+
+# orjson encodes and decodes the notification_methods column faster than
+# the stdlib codec. It is optional - json is used if it is not installed.
+try:
+    import orjson
+
+    def _json_dumps(value: Any) -> str:
+        return orjson.dumps(value).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# Per-connection SQLite tuning. WAL lets readers (get_events, alert checks)
+# proceed concurrently with the detection writer, and synchronous=NORMAL is
+# durable enough under WAL while cutting the one-fsync-per-insert cost of
+# the event-logging hot path. The cache is sized in KiB (negative value),
+# and mmap keeps warm pages out of the read() path on the Pi's SD card.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# Upper bound on pooled connections: detection writer + API handlers on a
+# Pi never need more, and each connection holds a 64 MiB page cache
+MAX_POOL_CONNECTIONS = 8
+
+# Buffered event logging: detections are flushed in one transaction once
+# this many rows accumulate or the oldest buffered row reaches this age,
+# so high-frequency detection never pays one transaction per frame
+EVENT_BUFFER_FLUSH_SIZE = 500
+EVENT_BUFFER_FLUSH_SECONDS = 1.0
+
+# Retry policy for transient "database is locked" errors on batch writes:
+# exponential backoff starting at 10 ms, five attempts total
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_BASE_DELAY_SECONDS = 0.01
+
+# Only reclaim pages with VACUUM (a full table rewrite) when a cleanup
+# pass actually deleted enough rows to make the rewrite worthwhile
+VACUUM_MIN_DELETED_ROWS = 1000
+
+# Event timestamps are stored as INTEGER epoch milliseconds: integer
+# range scans and index comparisons beat per-row ISO-text collation, and
+# binds/reads skip the isoformat/fromisoformat string round-trip
+MS_PER_SECOND = 1000
+NS_PER_MS = 1_000_000
+
+
+def _timestamp_ms(moment: Optional[datetime] = None) -> int:
+    """Convert a datetime (default: now) to the epoch-ms event clock."""
+    if moment is None:
+        return time.time_ns() // NS_PER_MS
+    return int(moment.timestamp() * MS_PER_SECOND)
+
+
+def timestamp_to_datetime(value: Any) -> datetime:
+    """Convert a stored event timestamp to a datetime.
+
+    New rows hold epoch milliseconds; rows written before the column
+    switched to INTEGER hold ISO text, so both are accepted.
+    """
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / MS_PER_SECOND)
+    return datetime.fromisoformat(value)
+
+
+# Full schema as one script, executed via executescript in init_database.
+# alert_config is keyed directly by user_id as a WITHOUT ROWID table:
+# every lookup is one B-tree traversal instead of autoindex -> rowid ->
+# table. The composite (filter, timestamp DESC) indexes let get_events
+# and get_last_event_time run as single index range scans with no sort
+# step; the old single-column event_log indexes they superseded are
+# dropped for databases that still carry them.
+_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS pets (
+        pet_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        species TEXT NOT NULL,
+        breed TEXT,
+        color TEXT,
+        birth_date DATE,
+        gender TEXT CHECK(gender IN ('male', 'female', 'unknown')),
+        weight_kg REAL,
+        microchip_id TEXT,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS event_log (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL
+            DEFAULT ((CAST(strftime('%s','now') AS INTEGER) * 1000)),
+        pet_id INTEGER,
+        event_type TEXT NOT NULL,
+        class_name TEXT,
+        media_path TEXT,
+        duration INTEGER,
+        confidence REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (pet_id) REFERENCES pets (pet_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS alert_config (
+        user_id TEXT PRIMARY KEY,
+        no_event_threshold INTEGER NOT NULL DEFAULT 60,
+        alert_enabled BOOLEAN NOT NULL DEFAULT 1,
+        notification_methods TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_event_log_timestamp
+        ON event_log (timestamp);
+    CREATE INDEX IF NOT EXISTS idx_event_log_pet_ts
+        ON event_log (pet_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_event_log_type_ts
+        ON event_log (event_type, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_pets_name
+        ON pets (name COLLATE NOCASE);
+
+    DROP INDEX IF EXISTS idx_event_log_pet_id;
+    DROP INDEX IF EXISTS idx_event_log_event_type;
+"""
+
+# Hot-path SQL as module constants: sqlite3 caches compiled statements per
+# connection keyed on the exact SQL text, so reusing one string object per
+# query guarantees the parse/plan work happens once per pooled connection
+_SQL_INSERT_EVENT = """
+    INSERT INTO event_log
+    (pet_id, event_type, class_name, media_path, duration, confidence, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+# LIMIT 1 over the (pet_id, timestamp DESC) / timestamp indexes: one
+# B-tree descent per call, with a plain no-row result when the table is
+# empty instead of MAX()'s synthesized NULL row
+_SQL_LAST_EVENT_ALL = "SELECT timestamp FROM event_log ORDER BY timestamp DESC LIMIT 1"
+_SQL_LAST_EVENT_BY_PET = (
+    "SELECT timestamp FROM event_log WHERE pet_id = ? ORDER BY timestamp DESC LIMIT 1"
+)
+
 
 class DatabaseManager:
     """Manages SQLite database operations for the pet monitoring system."""
@@ -46,107 +195,151 @@ class DatabaseManager:
         else:
             self.db_path = db_path
 
+        # URI paths (file:...?mode=memory&cache=shared) address named
+        # in-memory databases; they have no parent directory to create
+        self._is_uri = self.db_path.startswith("file:")
+
         # Ensure the directory exists
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        if not self._is_uri:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Connection pool: connections are expensive to open (~hundreds of
+        # microseconds of syscalls) and closing one throws away its hot page
+        # cache, so they are created lazily up to MAX_POOL_CONNECTIONS and
+        # reused across calls instead of opened per call
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._pool_lock = threading.Lock()
+        self._pool_size = 0
+
+        # Write-behind buffer for high-frequency event logging
+        self._event_buffer: List[tuple] = []
+        self._event_buffer_lock = threading.Lock()
+        self._event_flush_timer: Optional[threading.Timer] = None
+
+        # Cached event_log row count: COUNT(*) walks the whole B-tree, so
+        # the count is read once on the first stats call and maintained
+        # incrementally by the insert/cleanup paths afterwards
+        self._event_count: Optional[int] = None
+        self._event_count_lock = threading.Lock()
 
         logger.info(f"Database will be stored at: {self.db_path}")
         self.init_database()
 
-    def get_connection(self) -> sqlite3.Connection:
-        """Get a database connection with row factory."""
-        conn = sqlite3.connect(self.db_path)
+    def _create_connection(self) -> sqlite3.Connection:
+        """Create a new pooled connection with row factory and tuned PRAGMAs."""
+        # check_same_thread=False: pooled connections migrate between the
+        # detection thread and API worker threads (never used concurrently);
+        # isolation_level=None gives autocommit with manual BEGIN/COMMIT
+        # cached_statements sized so the event-log INSERT and the dashboard
+        # SELECTs stay resident in the per-connection statement cache
+        conn = sqlite3.connect(
+            self.db_path,
+            uri=self._is_uri,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
         conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
         return conn
 
+    @contextmanager
+    def get_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Acquire a pooled database connection.
+
+        Yields a reusable connection and returns it to the pool on exit
+        (rolling back any transaction left open by an error) instead of
+        closing it.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                under_limit = self._pool_size < MAX_POOL_CONNECTIONS
+                if under_limit:
+                    self._pool_size += 1
+            if under_limit:
+                conn = self._create_connection()
+            else:
+                # Pool exhausted: wait for a connection to be returned
+                conn = self._pool.get()
+
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        """Flush buffered events and close all pooled connections."""
+        self.flush_events()
+        with self._pool_lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._pool_size -= 1
+
     def init_database(self) -> None:
         """Initialize the database with required tables."""
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Create Pet table
-                cursor.execute(
-                    """
-                        CREATE TABLE IF NOT EXISTS pets (
-                            pet_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            name TEXT NOT NULL UNIQUE,
-                            species TEXT NOT NULL,
-                            breed TEXT,
-                            color TEXT,
-                            birth_date DATE,
-                            gender TEXT CHECK(gender IN ('male', 'female', 'unknown')),
-                            weight_kg REAL,
-                            microchip_id TEXT,
-                            notes TEXT,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """
-                )
-
-                # Create Event Log table
-                cursor.execute(
-                    """
-                        CREATE TABLE IF NOT EXISTS event_log (
-                            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                            pet_id INTEGER,
-                            event_type TEXT NOT NULL,
-                            class_name TEXT,
-                            media_path TEXT,
-                            duration INTEGER,
-                            confidence REAL,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            FOREIGN KEY (pet_id) REFERENCES pets (pet_id)
-                        )
-                    """
-                )
-
-                # Create Alert Config table
-                cursor.execute(
+                # One executescript call: sqlite3_exec parses the
+                # statements back-to-back in C instead of paying a
+                # prepare/finalize round-trip through the sqlite3
+                # extension per CREATE
+                conn.executescript(_SCHEMA_SQL)
+
+                # One-time migration: databases created before the
+                # epoch-ms switch hold ISO text timestamps, which SQLite
+                # orders after every INTEGER (breaking timestamp DESC)
+                # and which integer range binds never match. Rewrite
+                # them in place; typeof() makes re-runs a no-op.
+                migrated = conn.execute(
                     """
-                        CREATE TABLE IF NOT EXISTS alert_config (
-                            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            user_id TEXT NOT NULL,
-                            no_event_threshold INTEGER NOT NULL DEFAULT 60,
-                            alert_enabled BOOLEAN NOT NULL DEFAULT 1,
-                            notification_methods TEXT,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            UNIQUE(user_id)
-                        )
-                    """
-                )
-
-                # Create indexes for better performance
-                cursor.execute(
-                    """
-                        CREATE INDEX IF NOT EXISTS idx_event_log_timestamp 
-                        ON event_log (timestamp)
-                    """
-                )
-
-                cursor.execute(
-                    """
-                        CREATE INDEX IF NOT EXISTS idx_event_log_pet_id 
-                        ON event_log (pet_id)
-                    """
-                )
+                    UPDATE event_log
+                    SET timestamp =
+                        CAST(strftime('%s', timestamp) AS INTEGER) * ?
+                    WHERE typeof(timestamp) = 'text'
+                        AND strftime('%s', timestamp) IS NOT NULL
+                    """,
+                    (MS_PER_SECOND,),
+                ).rowcount
+                if migrated:
+                    logger.info(
+                        f"Migrated {migrated} legacy text timestamps to epoch ms"
+                    )
 
-                cursor.execute(
-                    """
-                        CREATE INDEX IF NOT EXISTS idx_event_log_event_type 
-                        ON event_log (event_type)
-                    """
-                )
+                # Seed planner statistics only on first build: ANALYZE
+                # rescans every event_log index, which is too expensive
+                # to repeat at each server start on the SD card. The
+                # PRAGMA optimize in cleanup_old_events refreshes stats
+                # as the data grows.
+                stats_present = conn.execute(
+                    "SELECT 1 FROM sqlite_master "
+                    "WHERE type='table' AND name='sqlite_stat1'"
+                ).fetchone()
+                if stats_present is None:
+                    conn.execute("ANALYZE")
 
-                conn.commit()
                 logger.info("Database initialized successfully")
 
         except sqlite3.Error as e:
             logger.error(f"Error initializing database: {e}")
             raise
 
+    def _adjust_event_count(self, delta: int) -> None:
+        """Shift the cached event_log row count, if it is initialized."""
+        with self._event_count_lock:
+            if self._event_count is not None:
+                self._event_count += delta
+
     def add_pet(
         self,
         name: str,
@@ -218,7 +411,9 @@ class DatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT * FROM pets ORDER BY name")
+                # COLLATE NOCASE matches idx_pets_name, so the sort is
+                # satisfied by the index instead of a temp B-tree
+                cursor.execute("SELECT * FROM pets ORDER BY name COLLATE NOCASE")
                 return [dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             logger.error(f"Error fetching pets: {e}")
@@ -271,11 +466,7 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    """
-                    INSERT INTO event_log 
-                    (pet_id, event_type, class_name, media_path, duration, confidence)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """,
+                    _SQL_INSERT_EVENT,
                     (
                         pet_id,
                         event_type,
@@ -283,9 +474,11 @@ class DatabaseManager:
                         media_path,
                         duration,
                         confidence,
+                        _timestamp_ms(),
                     ),
                 )
                 conn.commit()
+                self._adjust_event_count(1)
                 event_id = cursor.lastrowid
                 logger.info(
                     f"Logged event {event_id}: {event_type} for {class_name} (pet {pet_id})"
@@ -295,6 +488,120 @@ class DatabaseManager:
             logger.error(f"Error logging event: {e}")
             raise
 
+    def log_event_async(
+        self,
+        pet_id: Optional[int],
+        event_type: str,
+        class_name: Optional[str] = None,
+        media_path: Optional[str] = None,
+        duration: Optional[int] = None,
+        confidence: Optional[float] = None,
+    ) -> None:
+        """
+        Buffer an event for batched insertion.
+
+        Appends to an in-memory buffer that is flushed in a single
+        transaction via flush_events() once EVENT_BUFFER_FLUSH_SIZE rows
+        accumulate or EVENT_BUFFER_FLUSH_SECONDS elapse, amortizing the
+        per-transaction cost across many detections. Use log_event() when
+        the caller needs the event_id immediately.
+        """
+        with self._event_buffer_lock:
+            # Stamp at buffering time so the stored timestamp reflects the
+            # detection, not the later batched flush
+            self._event_buffer.append(
+                (
+                    pet_id,
+                    event_type,
+                    class_name,
+                    media_path,
+                    duration,
+                    confidence,
+                    _timestamp_ms(),
+                )
+            )
+            should_flush = len(self._event_buffer) >= EVENT_BUFFER_FLUSH_SIZE
+            if not should_flush and self._event_flush_timer is None:
+                self._event_flush_timer = threading.Timer(
+                    EVENT_BUFFER_FLUSH_SECONDS, self.flush_events
+                )
+                self._event_flush_timer.daemon = True
+                self._event_flush_timer.start()
+
+        if should_flush:
+            self.flush_events()
+
+    def log_events_bulk(self, rows: List[tuple]) -> int:
+        """
+        Insert many events in a single transaction.
+
+        Args:
+            rows: Tuples of (pet_id, event_type, class_name, media_path,
+                  duration, confidence), matching the log_event arguments
+
+        Returns:
+            Number of events inserted
+        """
+        if not rows:
+            return 0
+        stamp = _timestamp_ms()
+        stamped_rows = [tuple(row) + (stamp,) for row in rows]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # One BEGIN/COMMIT around executemany: N rows cost one
+                # transaction instead of one commit per row
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.executemany(_SQL_INSERT_EVENT, stamped_rows)
+                conn.commit()
+                self._adjust_event_count(len(rows))
+                logger.info(f"Bulk-inserted {len(rows)} events")
+                return len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"Error bulk-inserting events: {e}")
+            raise
+
+    def flush_events(self) -> int:
+        """
+        Flush all buffered events in a single transaction.
+
+        Returns:
+            Number of events written
+        """
+        with self._event_buffer_lock:
+            if self._event_flush_timer is not None:
+                self._event_flush_timer.cancel()
+                self._event_flush_timer = None
+            rows = self._event_buffer
+            self._event_buffer = []
+
+        if not rows:
+            return 0
+
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                with self.get_connection() as conn:
+                    cursor = conn.cursor()
+                    # BEGIN IMMEDIATE takes the write lock up front so the
+                    # batch commits as one WAL append instead of one per row
+                    cursor.execute("BEGIN IMMEDIATE")
+                    cursor.executemany(_SQL_INSERT_EVENT, rows)
+                    conn.commit()
+                    self._adjust_event_count(len(rows))
+                    logger.info(f"Flushed {len(rows)} buffered events")
+                    return len(rows)
+            except sqlite3.OperationalError as e:
+                # Another writer holds the lock: back off and retry instead
+                # of dropping the batch
+                if "locked" in str(e) and attempt < LOCK_RETRY_ATTEMPTS - 1:
+                    time.sleep(LOCK_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+                    continue
+                logger.error(f"Error flushing buffered events: {e}")
+                raise
+            except sqlite3.Error as e:
+                logger.error(f"Error flushing buffered events: {e}")
+                raise
+
     def get_events(
         self,
         pet_id: Optional[int] = None,
@@ -303,6 +610,7 @@ class DatabaseManager:
         end_date: Optional[datetime] = None,
         limit: int = 100,
         offset: int = 0,
+        _raw: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Get events from the database with optional filtering.
@@ -337,11 +645,11 @@ class DatabaseManager:
 
             if start_date:
                 query += " AND e.timestamp >= ?"
-                params.append(start_date.isoformat())
+                params.append(_timestamp_ms(start_date))
 
             if end_date:
                 query += " AND e.timestamp <= ?"
-                params.append(end_date.isoformat())
+                params.append(_timestamp_ms(end_date))
 
             query += " ORDER BY e.timestamp DESC LIMIT ? OFFSET ?"
             params.extend([limit, offset])
@@ -349,15 +657,78 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
-                events = []
-                for row in cursor.fetchall():
-                    event = dict(row)
-                    events.append(event)
-                return events
+                # Iterate the cursor directly: no intermediate fetchall()
+                # list, one dict per row for the JSON layer (or the rows
+                # themselves for get_events_raw)
+                if _raw:
+                    return cursor.fetchall()
+                return [dict(row) for row in cursor]
         except sqlite3.Error as e:
             logger.error(f"Error fetching events: {e}")
             raise
 
+    def get_events_since(
+        self, seconds_ago: int, limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Get events from the last seconds_ago seconds.
+
+        The cutoff is computed inside SQLite from the current clock, so a
+        "recent events" poll is a single round trip with no Python-side
+        datetime arithmetic per call.
+
+        Args:
+            seconds_ago: Look-back window in seconds
+            limit: Maximum number of events to return
+
+        Returns:
+            List of event dictionaries, newest first
+        """
+        try:
+            query = """
+                SELECT e.*, p.name as pet_name
+                FROM event_log e
+                LEFT JOIN pets p ON e.pet_id = p.pet_id
+                WHERE e.timestamp >=
+                    (CAST(strftime('%s', 'now') AS INTEGER) - ?) * 1000
+                ORDER BY e.timestamp DESC LIMIT ?
+            """
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (seconds_ago, limit))
+                return [dict(row) for row in cursor]
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching recent events: {e}")
+            raise
+
+    def get_events_raw(
+        self,
+        pet_id: Optional[int] = None,
+        event_type: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Get events as sqlite3.Row objects without per-row dict conversion.
+
+        Rows support name-based __getitem__ and .keys(), so consumers that
+        only read a few columns (alert checks, aggregation) skip the dict
+        allocation and key copying that get_events pays per row. Takes the
+        same filters as get_events.
+        """
+        for event in self.get_events(
+            pet_id=pet_id,
+            event_type=event_type,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            offset=offset,
+            _raw=True,
+        ):
+            yield event
+
     def get_event_by_id(self, event_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a specific event by ID.
@@ -389,6 +760,38 @@ class DatabaseManager:
             logger.error(f"Error fetching event {event_id}: {e}")
             raise
 
+    def get_events_by_ids(self, event_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Get several events by ID with a single query.
+
+        One parse/plan/executor pass covers the whole batch instead of
+        the point SELECT per id that repeated get_event_by_id calls pay.
+
+        Args:
+            event_ids: Event IDs to fetch
+
+        Returns:
+            List of event dictionaries, ordered by event_id
+        """
+        if not event_ids:
+            return []
+        try:
+            placeholders = ",".join("?" * len(event_ids))
+            query = f"""
+                SELECT e.*, p.name as pet_name
+                FROM event_log e
+                LEFT JOIN pets p ON e.pet_id = p.pet_id
+                WHERE e.event_id IN ({placeholders})
+                ORDER BY e.event_id
+            """
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, event_ids)
+                return [dict(row) for row in cursor]
+        except sqlite3.Error as e:
+            logger.error(f"Error fetching events {event_ids}: {e}")
+            raise
+
     def set_alert_config(
         self,
         user_id: str,
@@ -407,7 +810,7 @@ class DatabaseManager:
         """
         try:
             methods_json = (
-                json.dumps(notification_methods) if notification_methods else None
+                _json_dumps(notification_methods) if notification_methods else None
             )
 
             with self.get_connection() as conn:
@@ -449,7 +852,7 @@ class DatabaseManager:
                 if row:
                     config = dict(row)
                     if config["notification_methods"]:
-                        config["notification_methods"] = json.loads(
+                        config["notification_methods"] = _json_loads(
                             config["notification_methods"]
                         )
                     return config
@@ -472,18 +875,13 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 if pet_id is not None:
-                    cursor.execute(
-                        """
-                        SELECT MAX(timestamp) FROM event_log WHERE pet_id = ?
-                    """,
-                        (pet_id,),
-                    )
+                    cursor.execute(_SQL_LAST_EVENT_BY_PET, (pet_id,))
                 else:
-                    cursor.execute("SELECT MAX(timestamp) FROM event_log")
+                    cursor.execute(_SQL_LAST_EVENT_ALL)
 
-                result = cursor.fetchone()[0]
-                if result:
-                    return datetime.fromisoformat(result)
+                row = cursor.fetchone()
+                if row is not None:
+                    return timestamp_to_datetime(row[0])
                 return None
         except sqlite3.Error as e:
             logger.error(f"Error fetching last event time: {e}")
@@ -500,21 +898,35 @@ class DatabaseManager:
             Number of events deleted
         """
         try:
-            cutoff_date = datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            cutoff_date = cutoff_date.replace(day=cutoff_date.day - days_to_keep)
+            # timedelta handles month/year boundaries; the previous
+            # day-field arithmetic raised ValueError whenever days_to_keep
+            # reached the current day of month, silently disabling cleanup.
+            # The cutoff is measured from now, so days_to_keep=0 purges
+            # everything logged so far
+            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
 
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # Inclusive comparison: an event stamped in the same
+                # millisecond as the cutoff is already days_to_keep old
                 cursor.execute(
                     """
-                    DELETE FROM event_log WHERE timestamp < ?
+                    DELETE FROM event_log WHERE timestamp <= ?
                 """,
-                    (cutoff_date.isoformat(),),
+                    (_timestamp_ms(cutoff_date),),
                 )
                 deleted_count = cursor.rowcount
                 conn.commit()
+                self._adjust_event_count(-deleted_count)
+                # Periodic maintenance is the natural place to force a WAL
+                # checkpoint so the log cannot grow without bound between
+                # cleanup runs
+                cursor.execute("PRAGMA wal_checkpoint(RESTART)")
+                # After a large deletion, refresh planner statistics and
+                # give the freed pages back to the filesystem
+                if deleted_count >= VACUUM_MIN_DELETED_ROWS:
+                    cursor.execute("PRAGMA optimize")
+                    cursor.execute("VACUUM")
                 logger.info(f"Cleaned up {deleted_count} old events")
                 return deleted_count
         except sqlite3.Error as e:
@@ -532,22 +944,35 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
 
-                # Get table counts
-                cursor.execute("SELECT COUNT(*) FROM pets")
-                pet_count = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM event_log")
-                event_count = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM alert_config")
-                config_count = cursor.fetchone()[0]
-
-                # Get database file size
-                db_size = (
-                    Path(self.db_path).stat().st_size
-                    if Path(self.db_path).exists()
-                    else 0
+                # Get the small table counts in a single statement: one
+                # parse and one round-trip, and SQLite satisfies each
+                # COUNT(*) from the narrowest available index
+                cursor.execute(
+                    """
+                    SELECT
+                        (SELECT COUNT(*) FROM pets) AS pets,
+                        (SELECT COUNT(*) FROM alert_config) AS alert_configs
+                """
                 )
+                pet_count, config_count = cursor.fetchone()
+
+                # event_log can hold months of detections, so its COUNT(*)
+                # B-tree walk runs once and the cached value is maintained
+                # incrementally by the insert and cleanup paths
+                with self._event_count_lock:
+                    event_count = self._event_count
+                if event_count is None:
+                    cursor.execute("SELECT COUNT(*) FROM event_log")
+                    event_count = cursor.fetchone()[0]
+                    with self._event_count_lock:
+                        self._event_count = event_count
+
+                # Size from SQLite's own page accounting: works for
+                # in-memory databases too, and unlike a file stat it is
+                # not skewed by an unmerged WAL
+                page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+                page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+                db_size = page_count * page_size
 
                 return {
                     "pets": pet_count,
@@ -561,10 +986,14 @@ class DatabaseManager:
             raise
 
 
-# Global database instance
-db_manager = DatabaseManager()
+# Global database instance, created lazily so importing this module (e.g.
+# from tests or CLI tooling) doesn't open connections or run DDL
+db_manager: Optional[DatabaseManager] = None
 
 
 def get_db() -> DatabaseManager:
-    """Get the global database manager instance."""
+    """Get or create the global database manager instance."""
+    global db_manager
+    if db_manager is None:
+        db_manager = DatabaseManager()
     return db_manager
@@ -5,16 +5,23 @@ This module handles simple object tracking and event detection for ENTERING_AREA
 It maintains a simple list of detected object classes and logs events when objects appear or disappear.
 """
 
+import itertools
 import logging
 import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Set
 
+import numpy as np
+
 from .database import get_db
 from .models import EventType
 
 logger = logging.getLogger(__name__)
 
+# Size of the per-class state array (the COCO class space the detector
+# emits); grown on demand if a detection carries a larger class id
+NUM_DETECTOR_CLASSES = 80
+
 
 class EventTracker:
     """Simple tracker that detects when objects enter or leave the area."""
@@ -28,9 +35,17 @@ class EventTracker:
         """
         self.timeout_seconds = timeout_seconds
         
-        # Simple tracking: class_name -> last_seen_time
-        self.current_objects: Dict[str, float] = {}
+        # Per-class last-seen times as a flat float array indexed by class
+        # id (-inf = not present): presence and timeout checks become one
+        # vectorized comparison over the array instead of a Python dict
+        # iteration per class
+        self._last_seen = np.full(NUM_DETECTOR_CLASSES, -np.inf, dtype=np.float64)
+        self._class_names: Dict[int, str] = {}
         self.db = get_db()
+
+        # Tracker-local sequence for returned event handles; the database
+        # row id is assigned later by the batched write-behind flush
+        self._event_sequence = itertools.count(1)
         
         logger.info(f"EventTracker initialized with timeout={timeout_seconds}s")
     
@@ -44,117 +59,149 @@ class EventTracker:
             confidence: Detection confidence
             
         Returns:
-            Event ID from database
+            Tracker-local event sequence number (the database row id is
+            assigned asynchronously by the batched flush)
         """
-        # For now, we don't have pet_id identification, so we use None
-        # Pass class_name directly, no metadata needed
-        event_id = self.db.log_event(
+        # For now, we don't have pet_id identification, so we use None.
+        # log_event_async buffers the row for a batched flush, so the
+        # detection path never waits on a SQLite commit
+        self.db.log_event_async(
             pet_id=None,
             event_type=event_type.value,
             class_name=class_name,
             confidence=confidence
         )
-        
-        logger.info(f"Logged {event_type.value} event (ID: {event_id}) for {class_name} "
+        event_id = next(self._event_sequence)
+
+        logger.info(f"Logged {event_type.value} event (seq: {event_id}) for {class_name} "
                    f"(confidence: {confidence:.2f})")
-        
+
         return event_id
     
+    @property
+    def current_objects(self) -> Dict[str, float]:
+        """Currently present objects as class_name -> last_seen_time."""
+        present = np.nonzero(self._last_seen != -np.inf)[0]
+        return {
+            self._class_names.get(int(class_id), f"class_{class_id}"): float(
+                self._last_seen[class_id]
+            )
+            for class_id in present
+        }
+
+    def _ensure_class_capacity(self, class_id: int) -> None:
+        """Grow the last-seen array if a class id exceeds its current size."""
+        if class_id >= len(self._last_seen):
+            grown = np.full(class_id + 1, -np.inf, dtype=np.float64)
+            grown[: len(self._last_seen)] = self._last_seen
+            self._last_seen = grown
+
     def process_detections(self, detections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Process new detections and generate events.
-        
+
         Args:
             detections: List of detection dictionaries from YOLO
-            
+
         Returns:
             List of events that were generated
         """
         current_time = time.time()
         events_generated = []
-        
-        # Get unique classes detected in this frame
-        detected_classes = set()
-        class_confidences = {}
-        
-        for detection in detections:
-            class_name = detection['class_name']
-            detected_classes.add(class_name)
-            # Keep the highest confidence for each class
-            if class_name not in class_confidences or detection['confidence'] > class_confidences[class_name]:
-                class_confidences[class_name] = detection['confidence']
-        
-        for class_name in detected_classes:
-            if class_name not in self.current_objects:
-                confidence = class_confidences[class_name]
-                event_id = self._log_event(EventType.ENTERING_AREA, class_name, confidence)
-                
-                events_generated.append({
-                    'event_id': event_id,
-                    'event_type': EventType.ENTERING_AREA.value,
-                    'class_name': class_name,
-                    'confidence': confidence,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-                logger.info(f"ENTERING_AREA: {class_name} detected with confidence {confidence:.2f}")
-            
-            # Update last seen time for this class
-            self.current_objects[class_name] = current_time
-        
+        detected_ids: Set[int] = set()
+
+        if detections:
+            # Highest confidence per detected class id in one vectorized
+            # pass: sort boxes by class, then segment-reduce with
+            # np.maximum.reduceat instead of a per-box dict update
+            class_ids = np.fromiter(
+                (d['class'] for d in detections), dtype=np.intp, count=len(detections)
+            )
+            confidences = np.fromiter(
+                (d['confidence'] for d in detections),
+                dtype=np.float64,
+                count=len(detections),
+            )
+            order = np.argsort(class_ids, kind='stable')
+            unique_ids, segment_starts = np.unique(
+                class_ids[order], return_index=True
+            )
+            max_confidences = np.maximum.reduceat(confidences[order], segment_starts)
+
+            self._ensure_class_capacity(int(unique_ids[-1]))
+            # Record the display name once per distinct class, not per box
+            for index in order[segment_starts]:
+                detection = detections[index]
+                self._class_names[detection['class']] = detection['class_name']
+
+            for class_id, confidence in zip(unique_ids.tolist(),
+                                            max_confidences.tolist()):
+                detected_ids.add(class_id)
+                if self._last_seen[class_id] == -np.inf:
+                    class_name = self._class_names[class_id]
+                    event_id = self._log_event(EventType.ENTERING_AREA, class_name, confidence)
+
+                    events_generated.append({
+                        'event_id': event_id,
+                        'event_type': EventType.ENTERING_AREA.value,
+                        'class_name': class_name,
+                        'confidence': confidence,
+                        'timestamp': datetime.now().isoformat()
+                    })
+
+                    logger.info(f"ENTERING_AREA: {class_name} detected with confidence {confidence:.2f}")
+
+            # Update last seen times with one vectorized scatter
+            self._last_seen[unique_ids] = current_time
+
         # Check for objects that may have left the area
-        leaving_events = self._check_for_leaving_objects(current_time, detected_classes)
+        leaving_events = self._check_for_leaving_objects(current_time, detected_ids)
         events_generated.extend(leaving_events)
-        
+
         return events_generated
-    
-    def _check_for_leaving_objects(self, current_time: float, 
-                                  detected_classes: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+
+    def _check_for_leaving_objects(self, current_time: float,
+                                  detected_ids: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
         """
         Check for objects that have left the area (not seen for timeout_seconds).
-        
+
         Args:
             current_time: Current timestamp
-            detected_classes: Set of classes that were detected in current frame
-            
+            detected_ids: Class ids that were detected in the current frame
+
         Returns:
             List of LEAVING_AREA events
         """
-        if detected_classes is None:
-            detected_classes = set()
-        
+        # One vectorized pass over the per-class array: present and timed out
+        timed_out = (self._last_seen != -np.inf) & (
+            current_time - self._last_seen >= self.timeout_seconds
+        )
+        if detected_ids:
+            timed_out[list(detected_ids)] = False
+
         events_generated = []
-        classes_to_remove = []
-        
-        for class_name, last_seen in self.current_objects.items():
-            # Skip objects that were just seen
-            if class_name in detected_classes:
-                continue
-            
-            # Check if object has timed out
-            time_since_last_seen = current_time - last_seen
-            if time_since_last_seen >= self.timeout_seconds:
-                # Object has left the area - log LEAVING_AREA event
-                # Use a default confidence since we don't have the last detection confidence
-                confidence = 0.8  # Default confidence for leaving events
-                event_id = self._log_event(EventType.LEAVING_AREA, class_name, confidence)
-                
-                events_generated.append({
-                    'event_id': event_id,
-                    'event_type': EventType.LEAVING_AREA.value,
-                    'class_name': class_name,
-                    'confidence': confidence,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-                logger.info(f"LEAVING_AREA: {class_name} left area after {time_since_last_seen:.1f}s timeout")
-                
-                classes_to_remove.append(class_name)
-        
-        # Remove objects that have left
-        for class_name in classes_to_remove:
-            del self.current_objects[class_name]
-        
+        for class_id in np.nonzero(timed_out)[0]:
+            class_id = int(class_id)
+            class_name = self._class_names.get(class_id, f"class_{class_id}")
+            time_since_last_seen = current_time - self._last_seen[class_id]
+
+            # Object has left the area - log LEAVING_AREA event
+            # Use a default confidence since we don't have the last detection confidence
+            confidence = 0.8  # Default confidence for leaving events
+            event_id = self._log_event(EventType.LEAVING_AREA, class_name, confidence)
+
+            events_generated.append({
+                'event_id': event_id,
+                'event_type': EventType.LEAVING_AREA.value,
+                'class_name': class_name,
+                'confidence': confidence,
+                'timestamp': datetime.now().isoformat()
+            })
+
+            logger.info(f"LEAVING_AREA: {class_name} left area after {time_since_last_seen:.1f}s timeout")
+
+            self._last_seen[class_id] = -np.inf
+
         return events_generated
 
 # Global event tracker instance
@@ -31,6 +31,18 @@ def main():
     port = int(os.getenv("SERVER_PORT", "8000"))  # Default to port 8000
     reload = os.getenv("RELOAD", "true").lower() == "true"
     log_level = os.getenv("LOG_LEVEL", "info").lower()
+    workers = int(os.getenv("SERVER_WORKERS", "1"))
+
+    # The camera pipeline (capture thread, latest-frame slot, hardware
+    # encoder) lives in-process and the camera device can only be opened
+    # once, so the app must run as a single worker; the streaming service
+    # already fans one capture out to all connected viewers in-process.
+    if workers > 1:
+        logger.warning(
+            f"SERVER_WORKERS={workers} requested, but the camera pipeline is "
+            "single-process; forcing 1 worker"
+        )
+        workers = 1
 
     logger.info(f"🌐 Server will start on {host}:{port}")
 
@@ -46,6 +58,7 @@ def main():
             port=port,
             reload=reload,
             log_level=log_level,
+            workers=workers,
             access_log=True,
         )
     except KeyboardInterrupt:
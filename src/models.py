@@ -39,6 +39,11 @@ class EventType(str, Enum):
     # UNKNOWN = "unknown"
 
 
+# Direct value-to-member map for the hot parse path: a dict hit resolves
+# the enum without going through EnumMeta.__call__ on every request
+_EVENT_TYPE_LOOKUP = EventType._value2member_map_
+
+
 class PetSpecies(str, Enum):
     """Enumeration of pet species."""
 
@@ -100,6 +105,14 @@ class EventBase(BaseModel):
         None, description="Additional event metadata"
     )
 
+    @field_validator("event_type", mode="before")
+    @classmethod
+    def resolve_event_type(cls, v):
+        # Resolve known string values via the precomputed map; anything
+        # else (including unhashable payloads like dicts) is left for the
+        # regular enum validation and its 422 error message
+        return _EVENT_TYPE_LOOKUP.get(v, v) if isinstance(v, str) else v
+
 
 class EventCreate(EventBase):
     """Model for creating a new event."""
@@ -134,12 +147,20 @@ class EventFilter(BaseModel):
     )
     offset: int = Field(0, ge=0, description="Number of events to skip")
 
+    @field_validator("event_type", mode="before")
+    @classmethod
+    def resolve_event_type(cls, v):
+        return _EVENT_TYPE_LOOKUP.get(v, v) if isinstance(v, str) else v
+
     @field_validator("end_date")
     @classmethod
     def end_date_after_start_date(cls, v, info):
-        if v and info.data.get("start_date"):
-            if v <= info.data["start_date"]:
-                raise ValueError("end_date must be after start_date")
+        # Bail out before touching info.data on the common unfiltered path
+        if v is None:
+            return v
+        start_date = info.data.get("start_date")
+        if start_date is not None and v <= start_date:
+            raise ValueError("end_date must be after start_date")
         return v
 
 
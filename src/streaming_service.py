@@ -5,16 +5,22 @@ This module provides MJPEG streaming capabilities for the web dashboard.
 It consumes frames from the camera service without controlling the camera directly.
 """
 
+import asyncio
 import logging
-import time
-from typing import Iterator
+import threading
+from typing import AsyncIterator
 
+from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
 
 from .camera_manager import get_camera_manager
 
 logger = logging.getLogger(__name__)
 
+# Each viewer costs one JPEG relay loop; past this the Pi degrades for
+# everyone, so additional clients are refused with 503 instead
+MAX_ACTIVE_STREAMS = 10
+
 
 class StreamingService:
     """
@@ -25,7 +31,29 @@ class StreamingService:
     def __init__(self):
         self.camera_manager = get_camera_manager()
         self.active_streams = 0
-        self.is_streaming_active = False
+        # Guards the viewer counter: += on an attribute is a read-modify-write
+        # and concurrent connect/disconnect would otherwise lose updates
+        self._stream_count_lock = threading.Lock()
+        # Cancellation token shared by all stream generators: set() is an
+        # atomic broadcast, so stop_streaming needs no lock and every client
+        # loop observes shutdown on its next iteration
+        self._shutdown_event = threading.Event()
+        self._shutdown_event.set()
+        # Relay statistics: frames sent to clients and frames skipped
+        # because a client was slower than the capture cadence
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        # Static parts of the MJPEG multipart framing, encoded once instead
+        # of f-string-building them for every frame of every stream. The
+        # boundary is sent once up front and then *after* each frame's
+        # payload, so browsers treat every part as complete on arrival and
+        # render it immediately instead of holding it until the next frame.
+        # Content-Length is optional in multipart/x-mixed-replace (the
+        # boundary delimits each part), so the whole part header is one
+        # constant bytes object reused for every frame of every stream.
+        self._stream_preamble = b"--frame\r\n"
+        self._part_header = b"Content-Type: image/jpeg\r\n\r\n"
+        self._frame_trailer = b"\r\n--frame\r\n"
         logger.info("StreamingService initialized")
 
     def start_streaming(self) -> bool:
@@ -41,7 +69,7 @@ class StreamingService:
                     logger.error("Failed to start camera service for streaming")
                     return False
 
-            self.is_streaming_active = True
+            self._shutdown_event.clear()
             logger.info("Streaming service activated")
             return True
 
@@ -54,9 +82,14 @@ class StreamingService:
         Stop streaming service.
         Note: This doesn't stop the camera service, just marks streaming as inactive.
         """
-        self.is_streaming_active = False
+        self._shutdown_event.set()
         logger.info("Streaming service deactivated")
 
+    @property
+    def is_streaming_active(self) -> bool:
+        """Whether the streaming service is accepting/serving streams."""
+        return not self._shutdown_event.is_set()
+
     def is_active(self) -> bool:
         """Check if streaming service is active."""
         return self.is_streaming_active
@@ -70,63 +103,108 @@ class StreamingService:
         if not self.is_streaming_active:
             raise Exception("Streaming service not active, cannot stream")
 
+        if self.active_streams >= MAX_ACTIVE_STREAMS:
+            logger.warning(
+                f"Rejecting stream request: {self.active_streams} active streams "
+                f"(limit {MAX_ACTIVE_STREAMS})"
+            )
+            raise HTTPException(
+                status_code=503, detail="Maximum number of concurrent streams reached"
+            )
+
         return StreamingResponse(
             self._create_stream(),
             media_type="multipart/x-mixed-replace; boundary=frame",
         )
 
-    def _create_stream(self) -> Iterator[bytes]:
-        """Generate MJPEG frames for streaming."""
-        self.active_streams += 1
+    async def _create_stream(self) -> AsyncIterator[bytes]:
+        """
+        Generate MJPEG frames for streaming.
+
+        Async generator so Starlette streams it on the event loop directly
+        instead of shuttling every yield through its thread pool. The
+        capture thread signals new frames via call_soon_threadsafe.
+        """
+        with self._stream_count_lock:
+            self.active_streams += 1
         logger.info(f"New stream started. Active streams: {self.active_streams}")
 
+        loop = asyncio.get_running_loop()
+        frame_available = asyncio.Event()
+
+        def _on_frame() -> None:
+            loop.call_soon_threadsafe(frame_available.set)
+
+        camera_service = self.camera_manager.get_camera_service()
+        camera_service.add_frame_callback(_on_frame)
+        last_frame_number = -1
+        last_frame_hash = None
+        last_frame_jpeg = None
+
         try:
-            camera_service = self.camera_manager.get_camera_service()
-            
-            while self.is_streaming_active and camera_service.is_active():
+            # Leading boundary - each frame then closes its own part
+            yield self._stream_preamble
+
+            while not self._shutdown_event.is_set() and camera_service.is_active():
                 try:
-                    # Get latest frame from camera manager
-                    frame = self.camera_manager.get_latest_frame()
-                    
-                    if frame is None:
-                        logger.debug("No frame data available, waiting...")
-                        time.sleep(0.1)
+                    try:
+                        await asyncio.wait_for(frame_available.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        logger.debug("No new frame within timeout, waiting...")
                         continue
+                    frame_available.clear()
 
-                    # Convert frame to JPEG (consumer responsibility)
-                    frame_jpeg = frame.to_jpeg(quality=camera_service.config.quality)
+                    frame = camera_service.get_latest_frame()
+                    if frame is None or frame.frame_number <= last_frame_number:
+                        continue
 
-                    # Format frame for MJPEG streaming
-                    yield self._format_frame(frame_jpeg)
-                    
-                    # Control frame rate for streaming
-                    time.sleep(1.0 / camera_service.config.frame_rate)
+                    # Frames the camera published while this client was busy
+                    # are dropped (latest-frame slot), keeping live latency
+                    # near one frame period instead of queueing a backlog
+                    if last_frame_number >= 0:
+                        self.frames_dropped += frame.frame_number - last_frame_number - 1
+                    last_frame_number = frame.frame_number
+
+                    # Idle cameras publish bit-identical frames at full
+                    # rate; a strided-sample hash catches those and reuses
+                    # the previous JPEG instead of re-encoding
+                    frame_hash = frame.quick_hash()
+                    if frame_hash == last_frame_hash and last_frame_jpeg is not None:
+                        frame_jpeg = last_frame_jpeg
+                    else:
+                        # Convert frame to JPEG off the event loop (cached on
+                        # the Frame, so all connected clients share one encode)
+                        frame_jpeg = await asyncio.to_thread(
+                            frame.to_jpeg, camera_service.config.quality
+                        )
+                        last_frame_hash = frame_hash
+                        last_frame_jpeg = frame_jpeg
+
+                    # Yield the constant framing and the JPEG payload as
+                    # separate chunks: no per-frame join/copy, the payload
+                    # bytes go straight from the encode cache to the socket
+                    self.frames_sent += 1
+                    yield self._part_header
+                    yield frame_jpeg
+                    yield self._frame_trailer
 
                 except Exception as e:
                     logger.error(f"Error generating frame: {e}")
                     break
 
         finally:
-            self.active_streams -= 1
+            camera_service.remove_frame_callback(_on_frame)
+            with self._stream_count_lock:
+                self.active_streams -= 1
             logger.info(f"Stream ended. Active streams: {self.active_streams}")
 
-    def _format_frame(self, frame_data: bytes) -> bytes:
-        """Format frame data for MJPEG streaming."""
-        return (
-            (
-                "--frame\r\n"
-                "Content-Type: image/jpeg\r\n"
-                f"Content-Length: {len(frame_data)}\r\n\r\n"
-            ).encode()
-            + frame_data
-            + b"\r\n"
-        )
-
     def get_status(self) -> dict:
         """Get current streaming service status."""
         return {
             "streaming_active": self.is_streaming_active,
             "active_streams": self.active_streams,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
             "camera_running": self.camera_manager.is_running(),
             "camera_status": self.camera_manager.get_status()
         }
@@ -18,27 +18,87 @@ Requirements:
 """
 
 import logging
+import os
+import struct
 import sys
 import time
 from pathlib import Path
 from typing import Optional, Tuple
 
+# Exclude this module from parallel pytest runs: it owns the physical
+# camera, which cannot be shared between xdist workers. pytest itself is
+# optional here so the script still runs standalone on a bare Pi.
+try:
+    import pytest
+
+    pytestmark = pytest.mark.serial
+except ImportError:
+    pass
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-# Test output directory
-TEST_OUTPUT_DIR = Path("tests/output")
+# Device-tree model string, used to detect the Pi generation
+RPI_MODEL_PATH = "/proc/device-tree/model"
+
+
+def platform_supports_hw_h264() -> bool:
+    """Report whether the SoC has a hardware H.264 encoder.
+
+    Pi 4 and earlier encode H.264 in hardware; the Pi 5 dropped the
+    encoder block, so H264Encoder silently falls back to software x264
+    there and saturates the CPU.
+    """
+    try:
+        with open(RPI_MODEL_PATH, "rb") as model_file:
+            model = model_file.read().decode("ascii", "ignore")
+    except OSError:
+        return True  # unknown platform: keep the default encoder
+    return "Raspberry Pi 5" not in model
+
+
+# Test output directory: prefer tmpfs so captures land in RAM instead of
+# competing with the camera DMA for SD-card bandwidth (and wearing the
+# card out across repeated validation runs); override via PETLOG_TEST_OUT
+_DEFAULT_OUTPUT_DIR = (
+    "/dev/shm/petlog_tests" if Path("/dev/shm").is_dir() else "tests/output"
+)
+TEST_OUTPUT_DIR = Path(os.environ.get("PETLOG_TEST_OUT", _DEFAULT_OUTPUT_DIR))
 TEST_IMAGE_PATH = TEST_OUTPUT_DIR / "test_image.jpg"
-TEST_VIDEO_PATH = TEST_OUTPUT_DIR / "test_video.h264"
+# With no hardware H.264 encoder the smoke test records MJPEG instead,
+# which is strictly lighter than a software x264 encode
+TEST_VIDEO_PATH = TEST_OUTPUT_DIR / (
+    "test_video.h264" if platform_supports_hw_h264() else "test_video.mjpeg"
+)
 
 # Test configuration constants
 TEST_VIDEO_DURATION_SECONDS = 1
+TEST_VIDEO_BITRATE_BPS = 10000000  # 10 Mbps
 IMAGE_RESOLUTION = (1920, 1080)  # 1080p
 VIDEO_RESOLUTION = (1280, 720)  # 720p
 
+# JPEG marker constants for header-only image validation
+JPEG_SOI = b"\xff\xd8"  # start of image
+JPEG_EOI = b"\xff\xd9"  # end of image
+JPEG_SOS_MARKER = 0xDA  # start of scan (entropy-coded data follows)
+# Start-of-frame markers carrying dimensions (SOF0..SOF15 minus the
+# DHT/JPG/DAC markers that share the range)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# All frame headers sit well within the first 64 KiB of the stream
+JPEG_HEADER_READ_BYTES = 65536
+
+# H.264 Annex-B constants for container-less video validation
+H264_START_CODE = b"\x00\x00\x00\x01"
+H264_NAL_TYPE_MASK = 0x1F
+H264_SLICE_NAL_TYPES = frozenset({1, 5})  # non-IDR and IDR coded slices
+
+# Set PETLOG_VERIFY_DECODE=1 to run the full OpenCV decode instead of
+# the cheap marker parse when deep validation is needed
+VERIFY_FULL_DECODE = os.environ.get("PETLOG_VERIFY_DECODE", "0") == "1"
+
 
 def setup_test_environment() -> None:
     """Create test output directory if it doesn't exist."""
@@ -110,7 +170,6 @@ def test_image_capture(camera: object) -> bool:
 def test_video_recording(camera: object) -> bool:
     """Test recording a short video clip."""
     try:
-        from picamera2.encoders import H264Encoder
         from picamera2.outputs import FileOutput
 
         logger.info(f"Recording {TEST_VIDEO_DURATION_SECONDS}s test video...")
@@ -125,8 +184,16 @@ def test_video_recording(camera: object) -> bool:
         camera.start()
         logger.info("Camera restarted for video recording")
 
-        # Set up encoder and output
-        encoder = H264Encoder(bitrate=10000000)  # 10Mbps
+        # Set up encoder and output: hardware H.264 where the SoC has the
+        # encoder block, MJPEG otherwise (see platform_supports_hw_h264)
+        if platform_supports_hw_h264():
+            from picamera2.encoders import H264Encoder
+
+            encoder = H264Encoder(bitrate=TEST_VIDEO_BITRATE_BPS)
+        else:
+            from picamera2.encoders import MJPEGEncoder
+
+            encoder = MJPEGEncoder(bitrate=TEST_VIDEO_BITRATE_BPS)
         output = FileOutput(str(TEST_VIDEO_PATH))
 
         # Start recording
@@ -149,6 +216,83 @@ def test_video_recording(camera: object) -> bool:
         return False
 
 
+def parse_jpeg_header(path: Path) -> Optional[Tuple[int, int, int]]:
+    """Extract (width, height, channels) from JPEG markers without decoding.
+
+    Checks the SOI/EOI byte pairs and walks the marker segments to the
+    start-of-frame header, so validation reads a few dozen bytes instead
+    of paying a full IDCT decode of the capture. Returns None if the file
+    is not a well-formed JPEG.
+    """
+    try:
+        with open(path, "rb") as jpeg_file:
+            header = jpeg_file.read(JPEG_HEADER_READ_BYTES)
+            jpeg_file.seek(-len(JPEG_EOI), os.SEEK_END)
+            trailer = jpeg_file.read(len(JPEG_EOI))
+    except OSError as e:
+        logger.error(f"Could not read JPEG header from {path}: {e}")
+        return None
+
+    if not header.startswith(JPEG_SOI) or trailer != JPEG_EOI:
+        return None
+
+    offset = len(JPEG_SOI)
+    while offset + 4 <= len(header):
+        if header[offset] != 0xFF:
+            return None
+        marker = header[offset + 1]
+        if marker == JPEG_SOS_MARKER:
+            # Entropy-coded data starts here; no frame header was found
+            return None
+        segment_length = struct.unpack_from(">H", header, offset + 2)[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack_from(">HH", header, offset + 5)
+            channels = header[offset + 9]
+            return width, height, channels
+        offset += 2 + segment_length
+    return None
+
+
+def count_h264_frames(path: Path) -> int:
+    """Count coded frames in a raw Annex-B H.264 stream.
+
+    Scans for start codes and counts the coded-slice NAL units (types 1
+    and 5) that follow, which map one-to-one to frames for the camera's
+    single-slice output. A linear byte scan replaces the libavformat
+    demux plus partial decode that cv2.VideoCapture needs to answer
+    CAP_PROP_FRAME_COUNT on a containerless stream.
+    """
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        logger.error(f"Could not read H.264 stream from {path}: {e}")
+        return 0
+
+    frame_count = 0
+    offset = data.find(H264_START_CODE)
+    while offset != -1:
+        nal_header_offset = offset + len(H264_START_CODE)
+        if nal_header_offset >= len(data):
+            break
+        nal_type = data[nal_header_offset] & H264_NAL_TYPE_MASK
+        if nal_type in H264_SLICE_NAL_TYPES:
+            frame_count += 1
+        offset = data.find(H264_START_CODE, nal_header_offset)
+    return frame_count
+
+
+def count_mjpeg_frames(path: Path) -> int:
+    """Count JPEG frames in an MJPEG stream by SOI marker occurrences."""
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        logger.error(f"Could not read MJPEG stream from {path}: {e}")
+        return 0
+    # SOI followed by another marker byte: avoids counting stray FFD8
+    # pairs inside entropy-coded data
+    return data.count(JPEG_SOI + b"\xff")
+
+
 def validate_captured_media() -> Tuple[bool, bool]:
     """Validate the captured image and video using OpenCV."""
     image_valid = False
@@ -159,9 +303,17 @@ def validate_captured_media() -> Tuple[bool, bool]:
 
         # Validate image
         if TEST_IMAGE_PATH.exists():
-            image = cv2.imread(str(TEST_IMAGE_PATH))
-            if image is not None:
-                height, width, channels = image.shape
+            if VERIFY_FULL_DECODE:
+                image = cv2.imread(str(TEST_IMAGE_PATH))
+                dimensions = (
+                    (image.shape[1], image.shape[0], image.shape[2])
+                    if image is not None
+                    else None
+                )
+            else:
+                dimensions = parse_jpeg_header(TEST_IMAGE_PATH)
+            if dimensions is not None:
+                width, height, channels = dimensions
                 logger.info(
                     f"✓ Image validation successful: {width}x{height}, {channels} channels"
                 )
@@ -169,22 +321,29 @@ def validate_captured_media() -> Tuple[bool, bool]:
             else:
                 logger.error("✗ Image validation failed: Could not read image")
 
-        # Validate video
+        # Validate video: the recording has no container, so count coded
+        # frames with a byte scan instead of asking FFmpeg to demux the
+        # whole stream (CAP_PROP_FPS is unreliable on Annex-B input)
         if TEST_VIDEO_PATH.exists():
-            cap = cv2.VideoCapture(str(TEST_VIDEO_PATH))
-            if cap.isOpened():
-                frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                duration = frame_count / fps if fps > 0 else 0
-
+            if VERIFY_FULL_DECODE:
+                cap = cv2.VideoCapture(str(TEST_VIDEO_PATH))
+                frame_count = (
+                    int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+                )
+                cap.release()
+            elif TEST_VIDEO_PATH.suffix == ".h264":
+                frame_count = count_h264_frames(TEST_VIDEO_PATH)
+            else:
+                frame_count = count_mjpeg_frames(TEST_VIDEO_PATH)
+            if frame_count > 0:
+                fps = frame_count / TEST_VIDEO_DURATION_SECONDS
                 logger.info(f"✓ Video validation successful:")
                 logger.info(f"  Frames: {frame_count}")
                 logger.info(f"  FPS: {fps:.2f}")
-                logger.info(f"  Duration: {duration:.2f} seconds")
+                logger.info(f"  Duration: {TEST_VIDEO_DURATION_SECONDS:.2f} seconds")
                 video_valid = True
-                cap.release()
             else:
-                logger.error("✗ Video validation failed: Could not open video")
+                logger.error("✗ Video validation failed: no coded frames found")
 
     except Exception as e:
         logger.error(f"✗ Media validation failed: {e}")
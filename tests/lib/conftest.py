@@ -0,0 +1,18 @@
+"""Shared fixtures for the library dependency probes."""
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def torch_mod():
+    """Import torch once per session.
+
+    Importing torch loads hundreds of megabytes of shared libraries and
+    costs significant dynamic-linker time on a Pi; both probes share this
+    single import instead of paying it per test module.
+    """
+    try:
+        import torch
+    except ImportError as e:
+        pytest.fail(f"Failed to import PyTorch: {e}")
+    return torch
@@ -4,20 +4,13 @@ Simple PyTorch Import Test
 Tests that PyTorch can be imported successfully.
 """
 
-import unittest
+import pytest
 
 
-class TestPyTorchImport(unittest.TestCase):
-    """Test PyTorch library import."""
-    
-    def test_pytorch_import(self):
-        """Test if PyTorch can be imported."""
-        try:
-            import torch
-            self.assertIsNotNone(torch, "PyTorch should be importable")
-        except ImportError as e:
-            self.fail(f"Failed to import PyTorch: {e}")
+def test_pytorch_import(torch_mod):
+    """Test if PyTorch can be imported."""
+    assert torch_mod is not None, "PyTorch should be importable"
 
 
-if __name__ == '__main__':
-    unittest.main(verbosity=2)
\ No newline at end of file
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -4,21 +4,14 @@ Simple YOLO Import Test
 Tests that YOLO can be imported successfully.
 """
 
-import unittest
+import pytest
 
 
-class TestYOLOImport(unittest.TestCase):
-    """Test YOLO library import."""
-    
-    def test_yolo_import(self):
-        """Test if YOLO can be imported via torch hub."""
-        try:
-            import torch
-            # Just test that we can access the hub - don't actually load model
-            self.assertTrue(hasattr(torch, 'hub'), "torch.hub should be available")
-        except ImportError as e:
-            self.fail(f"Failed to import torch for YOLO: {e}")
+def test_yolo_import(torch_mod):
+    """Test if YOLO can be imported via torch hub."""
+    # Just test that we can access the hub - don't actually load a model
+    assert hasattr(torch_mod, "hub"), "torch.hub should be available"
 
 
-if __name__ == '__main__':
-    unittest.main(verbosity=2)
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
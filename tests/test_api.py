@@ -6,17 +6,27 @@ from fastapi.testclient import TestClient
 from src.api import app
 from src.version import VERSION
 
-client = TestClient(app)
 
+@pytest.fixture(scope="session")
+def client():
+    """Session-scoped TestClient: app startup/shutdown run once.
 
-def test_root_endpoint():
+    The context-manager form runs the FastAPI lifespan a single time for
+    the whole suite (or per xdist worker) and reuses the ASGI transport
+    across requests instead of rebuilding it per test.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_root_endpoint(client):
     """Test the root endpoint serves the dashboard."""
     response = client.get("/")
     assert response.status_code == 200
     # Root endpoint now serves HTML dashboard, not JSON
 
 
-def test_api_info_endpoint():
+def test_api_info_endpoint(client):
     """Test the API info endpoint returns correct information."""
     response = client.get("/api")
     assert response.status_code == 200
@@ -27,7 +37,7 @@ def test_api_info_endpoint():
     assert data["documentation"] == "/docs"
 
 
-def test_health_endpoint():
+def test_health_endpoint(client):
     """Test the health check endpoint."""
     response = client.get("/health")
     assert response.status_code == 200
@@ -40,14 +50,14 @@ def test_health_endpoint():
     assert "storage_usage" in data
 
 
-def test_version_consistency():
+def test_version_consistency(client):
     """Test that version is consistent across endpoints."""
     api_response = client.get("/api")
     assert api_response.status_code == 200
     assert api_response.json()["version"] == VERSION
 
 
-def test_events_endpoint():
+def test_events_endpoint(client):
     """Test the events listing endpoint."""
     response = client.get("/events")
     assert response.status_code == 200
@@ -60,7 +70,7 @@ def test_events_endpoint():
     assert data["page_size"] == 50
 
 
-def test_events_pagination():
+def test_events_pagination(client):
     """Test events endpoint with pagination parameters."""
     response = client.get("/events?page=2&page_size=25")
     assert response.status_code == 200
@@ -69,14 +79,14 @@ def test_events_pagination():
     assert data["page_size"] == 25
 
 
-def test_pets_endpoint():
+def test_pets_endpoint(client):
     """Test the pets listing endpoint."""
     response = client.get("/pets")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
 
-def test_camera_status_endpoint():
+def test_camera_status_endpoint(client):
     """Test the camera status endpoint."""
     response = client.get("/camera/status")
     assert response.status_code == 200
@@ -86,7 +96,7 @@ def test_camera_status_endpoint():
     assert "fps" in data
 
 
-def test_create_event_endpoint():
+def test_create_event_endpoint(client):
     """Test creating a new event."""
     event_data = {
         "pet_id": 1,
@@ -105,14 +115,21 @@ def test_create_event_endpoint():
     assert data["pet_id"] == 1
 
 
-def test_invalid_event_type():
+def test_invalid_event_type(client):
     """Test creating an event with invalid event type."""
     event_data = {"pet_id": 1, "event_type": "invalid_event", "duration": 30.5}
     response = client.post("/event", json=event_data)
     assert response.status_code == 422  # Validation error
 
 
-def test_api_documentation_endpoints():
+def test_non_string_event_type(client):
+    """Test creating an event with an unhashable event type payload."""
+    event_data = {"pet_id": 1, "event_type": {"a": 1}, "duration": 30.5}
+    response = client.post("/event", json=event_data)
+    assert response.status_code == 422  # Validation error, not a 500
+
+
+def test_api_documentation_endpoints(client):
     """Test that API documentation endpoints are accessible."""
     # Test OpenAPI docs
     docs_response = client.get("/docs")
@@ -5,29 +5,86 @@ This module contains comprehensive tests for the SQLite database operations
 including schema creation, CRUD operations, and data integrity.
 """
 
-import os
-import tempfile
+import uuid
 from datetime import datetime, timedelta
-from pathlib import Path
 
 import pytest
 
-from src.database import DatabaseManager
+from src.database import MS_PER_SECOND, DatabaseManager
 from src.models import EventType
 
 
+@pytest.fixture(scope="session")
+def _db_backing():
+    """Create the shared in-memory test database once per session.
+
+    A uniquely named shared-cache in-memory database keeps every test
+    entirely in RAM (no fsync, no file cleanup) while still letting the
+    connection pool share one database across connections. Building it
+    once means the schema and index DDL run once instead of per test.
+    """
+    db_manager = DatabaseManager(
+        f"file:testdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    )
+    # Test-only durability overrides: production keeps WAL and
+    # synchronous=NORMAL, but tests never need crash safety, so drop the
+    # journal and fsync entirely in case the fixture is ever pointed back
+    # at a disk-backed database. locking_mode stays at the default so the
+    # connection pool can hand connections between tests freely.
+    with db_manager.get_connection() as conn:
+        conn.execute("PRAGMA journal_mode=MEMORY")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+    yield db_manager
+    db_manager.close()
+
+
+@pytest.fixture(scope="session")
+def filter_db():
+    """Pre-populated read-only database shared by the get_events tests.
+
+    The filter tests only read, so one shared dataset (two pets, four
+    events) amortizes the setup across all parametrized cases instead of
+    rebuilding pets and events per test.
+    """
+    db_manager = DatabaseManager(
+        f"file:filterdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    )
+    pet1_id = db_manager.add_pet("Fluffy", "cat")
+    pet2_id = db_manager.add_pet("Whiskers", "cat")
+    db_manager.log_event(pet1_id, EventType.ENTERING_AREA.value)
+    db_manager.log_event(pet2_id, EventType.LEAVING_AREA.value)
+    db_manager.log_event(pet1_id, EventType.LEAVING_AREA.value)
+    db_manager.log_event(pet1_id, EventType.ENTERING_AREA.value)
+    yield db_manager, pet1_id, pet2_id
+    db_manager.close()
+
+
 class TestDatabaseManager:
     """Test cases for DatabaseManager class."""
 
     @pytest.fixture
-    def temp_db(self):
-        """Create a temporary database for testing."""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
-        temp_file.close()
-        db_manager = DatabaseManager(temp_file.name)
-        yield db_manager
-        # Cleanup
-        os.unlink(temp_file.name)
+    def temp_db(self, _db_backing):
+        """Hand out the session database with a clean state per test.
+
+        DatabaseManager commits inside each method, so a SAVEPOINT
+        rollback cannot undo a test; truncating the three tables (and the
+        AUTOINCREMENT counters) after the yield is equivalent and cheap.
+        """
+        yield _db_backing
+        with _db_backing.get_connection() as conn:
+            conn.execute("DELETE FROM event_log")
+            conn.execute("DELETE FROM alert_config")
+            conn.execute("DELETE FROM pets")
+            conn.execute("DELETE FROM sqlite_sequence")
+        # The raw DELETEs bypass cleanup_old_events, so drop the cached
+        # event count rather than leave it stale for the next test
+        _db_backing._event_count = None
+
+    @pytest.fixture
+    def fluffy(self, temp_db):
+        """Pet id for the standard 'Fluffy' cat most tests start from."""
+        return temp_db.add_pet("Fluffy", "cat")
 
     def test_database_initialization(self, temp_db):
         """Test that database tables are created correctly."""
@@ -57,8 +114,19 @@ class TestDatabaseManager:
             indexes = [row[0] for row in cursor.fetchall()]
 
             assert "idx_event_log_timestamp" in indexes
-            assert "idx_event_log_pet_id" in indexes
-            assert "idx_event_log_event_type" in indexes
+            assert "idx_event_log_pet_ts" in indexes
+            assert "idx_event_log_type_ts" in indexes
+            assert "idx_pets_name" in indexes
+
+            # alert_config is keyed directly by user_id (no surrogate
+            # rowid), so each lookup is a single B-tree traversal
+            cursor.execute(
+                """
+                SELECT sql FROM sqlite_master
+                WHERE type='table' AND name='alert_config'
+            """
+            )
+            assert "WITHOUT ROWID" in cursor.fetchone()[0]
 
     def test_add_pet(self, temp_db):
         """Test adding a new pet."""
@@ -106,10 +174,10 @@ class TestDatabaseManager:
         pet = temp_db.get_pet_by_id(999)
         assert pet is None
 
-    def test_log_event(self, temp_db):
+    def test_log_event(self, temp_db, fluffy):
         """Test logging a new event."""
         # Add a pet first
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+        pet_id = fluffy
 
         # Log an event
         event_id = temp_db.log_event(
@@ -147,85 +215,131 @@ class TestDatabaseManager:
         assert event["pet_name"] is None
         assert event["event_type"] == EventType.LEAVING_AREA.value
 
-    def test_get_events_no_filter(self, temp_db):
-        """Test retrieving events without filters."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+    @pytest.mark.parametrize(
+        "make_filter,expected_len",
+        [
+            pytest.param(lambda pet1_id: {}, 4, id="no_filter"),
+            pytest.param(lambda pet1_id: {"pet_id": pet1_id}, 3, id="pet_filter"),
+            pytest.param(
+                lambda pet1_id: {"event_type": EventType.ENTERING_AREA.value},
+                2,
+                id="type_filter",
+            ),
+            pytest.param(
+                lambda pet1_id: {
+                    "start_date": datetime.now() - timedelta(days=1),
+                    "end_date": datetime.now() + timedelta(days=1),
+                },
+                4,
+                id="date_filter",
+            ),
+        ],
+    )
+    def test_get_events_filters(self, filter_db, make_filter, expected_len):
+        """Test get_events filtering against the shared dataset."""
+        db_manager, pet1_id, _ = filter_db
+        filters = make_filter(pet1_id)
+        events = db_manager.get_events(**filters)
+
+        assert len(events) == expected_len
+        if "pet_id" in filters:
+            for event in events:
+                assert event["pet_id"] == pet1_id
+                assert event["pet_name"] == "Fluffy"
+        if "event_type" in filters:
+            for event in events:
+                assert event["event_type"] == filters["event_type"]
+        if "start_date" in filters:
+            for event in events:
+                event_time = datetime.fromtimestamp(
+                    event["timestamp"] / MS_PER_SECOND
+                )
+                assert filters["start_date"] <= event_time <= filters["end_date"]
+
+    def test_get_events_uses_pet_index(self, filter_db):
+        """Test that pet-filtered queries run on the composite index."""
+        db_manager, pet1_id, _ = filter_db
+        with db_manager.get_connection() as conn:
+            plan_rows = conn.execute(
+                """
+                EXPLAIN QUERY PLAN
+                SELECT * FROM event_log
+                WHERE pet_id = ? ORDER BY timestamp DESC
+            """,
+                (pet1_id,),
+            ).fetchall()
+
+        plan = " ".join(row[3] for row in plan_rows)
+        assert "USING INDEX idx_event_log_pet_ts" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_get_events_ordering(self, filter_db):
+        """Test that unfiltered events come back newest first."""
+        db_manager, _, _ = filter_db
+        events = db_manager.get_events()
+
+        # Reverse of the insertion order in the filter_db fixture
+        assert [event["event_type"] for event in events] == [
+            EventType.ENTERING_AREA.value,
+            EventType.LEAVING_AREA.value,
+            EventType.LEAVING_AREA.value,
+            EventType.ENTERING_AREA.value,
+        ]
+
+    def test_legacy_text_timestamp_migration(self, temp_db, fluffy):
+        """Test that init rewrites legacy ISO text timestamps to epoch ms."""
+        with temp_db.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO event_log (timestamp, pet_id, event_type) "
+                "VALUES (?, ?, ?)",
+                ("2023-01-15T12:00:00", fluffy, EventType.ENTERING_AREA.value),
+            )
+        recent_id = temp_db.log_event(fluffy, EventType.LEAVING_AREA.value)
 
-        # Log multiple events
-        temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
-        temp_db.log_event(pet_id, EventType.LEAVING_AREA.value)
-        temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
+        temp_db.init_database()
 
         events = temp_db.get_events()
+        # Newest-first ordering holds once the text row is an integer
+        assert events[0]["event_id"] == recent_id
+        assert all(isinstance(event["timestamp"], int) for event in events)
 
-        assert len(events) == 3
-        # Events should be ordered by timestamp DESC (newest first)
-        assert events[0]["event_type"] == EventType.ENTERING_AREA.value
-        assert events[1]["event_type"] == EventType.LEAVING_AREA.value
-        assert events[2]["event_type"] == EventType.ENTERING_AREA.value
-
-    def test_get_events_with_pet_filter(self, temp_db):
-        """Test retrieving events filtered by pet."""
-        pet1_id = temp_db.add_pet("Fluffy", "cat")
-        pet2_id = temp_db.add_pet("Whiskers", "cat")
-
-        temp_db.log_event(pet1_id, EventType.ENTERING_AREA.value)
-        temp_db.log_event(pet2_id, EventType.LEAVING_AREA.value)
-        temp_db.log_event(pet1_id, EventType.LEAVING_AREA.value)
-
-        # Filter by pet1
-        events = temp_db.get_events(pet_id=pet1_id)
-
-        assert len(events) == 2
-        for event in events:
-            assert event["pet_id"] == pet1_id
-            assert event["pet_name"] == "Fluffy"
-
-    def test_get_events_with_type_filter(self, temp_db):
-        """Test retrieving events filtered by event type."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
-
-        temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
-        temp_db.log_event(pet_id, EventType.LEAVING_AREA.value)
-        temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
-
-        # Filter by event type
-        events = temp_db.get_events(event_type=EventType.ENTERING_AREA.value)
-
-        assert len(events) == 2
-        for event in events:
-            assert event["event_type"] == EventType.ENTERING_AREA.value
-
-    def test_get_events_with_date_filter(self, temp_db):
-        """Test retrieving events filtered by date range."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
-
-        # Create events with different timestamps
-        now = datetime.now()
-        yesterday = now - timedelta(days=1)
-        tomorrow = now + timedelta(days=1)
+    def test_get_events_since(self, temp_db, fluffy):
+        """Test the recent-events lookback window."""
+        recent_id = temp_db.log_event(fluffy, EventType.ENTERING_AREA.value)
+        stale_id = temp_db.log_event(fluffy, EventType.LEAVING_AREA.value)
 
-        temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
+        # Backdate one event two hours so a one-hour window excludes it
+        two_hours_ms = 2 * 3600 * MS_PER_SECOND
+        with temp_db.get_connection() as conn:
+            conn.execute(
+                "UPDATE event_log SET timestamp = timestamp - ? WHERE event_id = ?",
+                (two_hours_ms, stale_id),
+            )
 
-        # Filter by date range
-        events = temp_db.get_events(start_date=yesterday, end_date=tomorrow)
+        events = temp_db.get_events_since(seconds_ago=3600)
 
-        assert len(events) == 1
-        event_time = datetime.fromisoformat(events[0]["timestamp"])
-        assert yesterday <= event_time <= tomorrow
+        assert [event["event_id"] for event in events] == [recent_id]
 
-    def test_get_events_pagination(self, temp_db):
+    def test_get_events_pagination(self, temp_db, fluffy):
         """Test event pagination."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
-
-        # Create 5 events
-        for i in range(5):
-            event_type = (
-                EventType.ENTERING_AREA.value
-                if i % 2 == 0
-                else EventType.LEAVING_AREA.value
-            )
-            temp_db.log_event(pet_id, event_type)
+        pet_id = fluffy
+
+        # Create 5 events in one transaction
+        temp_db.log_events_bulk(
+            [
+                (
+                    pet_id,
+                    EventType.ENTERING_AREA.value
+                    if i % 2 == 0
+                    else EventType.LEAVING_AREA.value,
+                    None,
+                    None,
+                    None,
+                    None,
+                )
+                for i in range(5)
+            ]
+        )
 
         # Get first 2 events
         events_page1 = temp_db.get_events(limit=2, offset=0)
@@ -240,6 +354,20 @@ class TestDatabaseManager:
         page2_ids = [e["event_id"] for e in events_page2]
         assert not set(page1_ids).intersection(set(page2_ids))
 
+    def test_get_events_by_ids(self, temp_db, fluffy):
+        """Test fetching several events with one batched query."""
+        event_ids = [
+            temp_db.log_event(fluffy, EventType.ENTERING_AREA.value),
+            temp_db.log_event(None, EventType.LEAVING_AREA.value),
+        ]
+
+        events = temp_db.get_events_by_ids(event_ids)
+
+        assert [event["event_id"] for event in events] == sorted(event_ids)
+        assert events[0]["pet_name"] == "Fluffy"
+        assert events[1]["pet_id"] is None
+        assert temp_db.get_events_by_ids([]) == []
+
     def test_set_alert_config(self, temp_db):
         """Test setting alert configuration."""
         user_id = "test_user"
@@ -281,14 +409,14 @@ class TestDatabaseManager:
         config = temp_db.get_alert_config("nonexistent_user")
         assert config is None
 
-    def test_get_last_event_time(self, temp_db):
+    def test_get_last_event_time(self, temp_db, fluffy):
         """Test retrieving last event timestamp."""
         # No events initially
         last_time = temp_db.get_last_event_time()
         assert last_time is None
 
         # Add a pet and event
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+        pet_id = fluffy
         temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
 
         last_time = temp_db.get_last_event_time()
@@ -304,18 +432,26 @@ class TestDatabaseManager:
         last_time_pet2 = temp_db.get_last_event_time(pet_id=pet2_id)
         assert last_time_pet2 is not None
 
-    def test_cleanup_old_events(self, temp_db):
+    def test_cleanup_old_events(self, temp_db, fluffy):
         """Test cleaning up old events."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
-
-        # Add some events
-        for i in range(3):
-            event_type = (
-                EventType.ENTERING_AREA.value
-                if i % 2 == 0
-                else EventType.LEAVING_AREA.value
-            )
-            temp_db.log_event(pet_id, event_type)
+        pet_id = fluffy
+
+        # Add some events in one transaction
+        temp_db.log_events_bulk(
+            [
+                (
+                    pet_id,
+                    EventType.ENTERING_AREA.value
+                    if i % 2 == 0
+                    else EventType.LEAVING_AREA.value,
+                    None,
+                    None,
+                    None,
+                    None,
+                )
+                for i in range(3)
+            ]
+        )
 
         # Cleanup with 0 days to keep (should delete all)
         deleted_count = temp_db.cleanup_old_events(days_to_keep=0)
@@ -326,10 +462,10 @@ class TestDatabaseManager:
         events = temp_db.get_events()
         assert len(events) == 0
 
-    def test_get_database_stats(self, temp_db):
+    def test_get_database_stats(self, temp_db, fluffy):
         """Test retrieving database statistics."""
         # Add some data
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+        pet_id = fluffy
         temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
         temp_db.set_alert_config("test_user", 60)
 
@@ -341,9 +477,9 @@ class TestDatabaseManager:
         assert stats["database_size_bytes"] > 0
         assert stats["database_path"] == temp_db.db_path
 
-    def test_event_class_name_field(self, temp_db):
+    def test_event_class_name_field(self, temp_db, fluffy):
         """Test that event class_name field works correctly."""
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+        pet_id = fluffy
 
         event_id = temp_db.log_event(
             pet_id=pet_id,
@@ -357,10 +493,10 @@ class TestDatabaseManager:
         assert event["class_name"] == "cat"
         assert event["confidence"] == 0.95
 
-    def test_foreign_key_constraint(self, temp_db):
+    def test_foreign_key_constraint(self, temp_db, fluffy):
         """Test that foreign key relationships work correctly."""
         # This test verifies that we can reference pets in events
-        pet_id = temp_db.add_pet("Fluffy", "cat")
+        pet_id = fluffy
         event_id = temp_db.log_event(pet_id, EventType.ENTERING_AREA.value)
 
         # Get event with pet name